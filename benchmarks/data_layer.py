@@ -0,0 +1,270 @@
+"""
+Project Rotom - Data Layer Benchmarks
+
+Latency of the PokeAPI data layer's hot paths against the local stand-in,
+in three cache states:
+
+    cold  every cache emptied before each call (network to the stand-in)
+    disk  in-memory caches emptied, persistent store kept
+    warm  nothing emptied
+
+    python -m benchmarks.data_layer
+    python -m benchmarks.data_layer --compare main HEAD
+
+--compare runs the same cases against two git revisions checked out as
+temporary worktrees and exits non-zero if any p50 regressed by more than
+--threshold percent. Revisions without the ROTOM_API_URL switch would hit
+the real API, so only compare revisions that have it.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATES = ("cold", "disk", "warm")
+CASES = (
+    "get_pokemon",
+    "search_pokemon_by_name",
+    "get_pokemon_weaknesses",
+    "get_evolution_chain",
+    "filter_union",
+)
+
+
+# ==================== WORKER ====================
+# Runs in a child process with PYTHONPATH set to the tree being measured
+
+
+def _cases():
+    from modules.constants import POKEMON_TYPES
+    from modules import pokeapi
+
+    types = POKEMON_TYPES
+    prefixes = ["ra", "zu", "mi", "ko", "pi", "ta", "ne", "vo", "ch", "lo", "ga"]
+
+    def filter_union(i):
+        # Same union PokedexFrame._apply_filter builds for a type selection
+        ids = set()
+        for t in (types[i % 18], types[(i + 5) % 18], types[(i + 11) % 18]):
+            for p in pokeapi.get_pokemon_by_type(t):
+                ids.add(p["id"])
+        return sorted(ids)
+
+    return {
+        "get_pokemon": lambda i: pokeapi.get_pokemon(i % 151 + 1),
+        "search_pokemon_by_name": lambda i: pokeapi.search_pokemon_by_name(
+            prefixes[i % len(prefixes)]
+        ),
+        "get_pokemon_weaknesses": lambda i: pokeapi.get_pokemon_weaknesses(
+            [types[i % 18], types[(i * 7 + 3) % 18]]
+        ),
+        "get_evolution_chain": lambda i: pokeapi.get_evolution_chain(i % 151 + 1),
+        "filter_union": filter_union,
+    }
+
+
+def _clear_memory():
+    import importlib
+
+    for name in ("pokeapi", "type_table", "team_analysis"):
+        try:
+            mod = importlib.import_module(f"modules.{name}")
+        except ImportError:
+            continue
+        for obj in list(vars(mod).values()):
+            if hasattr(obj, "cache_clear"):
+                obj.cache_clear()
+
+
+def _clear_disk():
+    try:
+        from modules.store import store
+    except ImportError:
+        return
+
+    with store.lock:
+        if store.conn is not None:
+            store.conn.close()
+            store.conn = None
+        try:
+            os.remove(store.path)
+        except OSError:
+            pass
+
+
+def _summary(times):
+    times = sorted(times)
+    return {
+        "n": len(times),
+        "mean_ms": round(statistics.mean(times), 3),
+        "p50_ms": round(times[len(times) // 2], 3),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+        "max_ms": round(times[-1], 3),
+    }
+
+
+def worker(iterations):
+    cases = _cases()
+    report = {}
+
+    for name in CASES:
+        fn = cases[name]
+        report[name] = {}
+
+        for state in STATES:
+            _clear_memory()
+            _clear_disk()
+            if state != "cold":
+                fn(0)
+
+            times = []
+            for i in range(iterations):
+                if state == "cold":
+                    _clear_memory()
+                    _clear_disk()
+                elif state == "disk":
+                    _clear_memory()
+                # Same key each time so disk and warm measure hits
+                arg = i if state == "cold" else 0
+                start = time.perf_counter()
+                fn(arg)
+                times.append((time.perf_counter() - start) * 1000)
+
+            report[name][state] = _summary(times)
+
+    print(json.dumps(report))
+
+
+# ==================== RUNNER ====================
+
+
+def run_tree(tree, base, iterations):
+    """Run the worker against a source tree, returns its report"""
+    with tempfile.TemporaryDirectory() as cache:
+        env = {
+            **os.environ,
+            "PYTHONPATH": tree,
+            "ROTOM_CACHE_DIR": cache,
+            "ROTOM_API_URL": f"{base}/api/v2",
+            "ROTOM_SPRITE_URL": f"{base}/sprites",
+        }
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", str(iterations)],
+            env=env,
+            cwd=tree,
+            capture_output=True,
+            text=True,
+        )
+    if out.returncode:
+        sys.exit(f"Benchmark failed in {tree}:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def start_standin(latency, jitter):
+    from benchmarks.standin import parse_args, serve
+
+    server = serve(
+        parse_args(["--port", "0", "--latency", str(latency), "--jitter", str(jitter)])
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def worktree(rev, dest):
+    subprocess.run(
+        ["git", "-C", ROOT, "worktree", "add", "--detach", dest, rev],
+        check=True,
+        capture_output=True,
+    )
+
+
+def drop_worktree(dest):
+    subprocess.run(
+        ["git", "-C", ROOT, "worktree", "remove", "--force", dest],
+        capture_output=True,
+    )
+
+
+def print_report(report):
+    print(f"{'case':26}" + "".join(f"{s + ' p50/p95 ms':>22}" for s in STATES))
+    for name, states in report.items():
+        cols = "".join(
+            f"{states[s]['p50_ms']:>12.3f}/{states[s]['p95_ms']:<9.3f}" for s in STATES
+        )
+        print(f"{name:26}{cols}")
+
+
+def print_compare(a, b, rev_a, rev_b, threshold, floor):
+    """Prints p50 deltas, returns the regressions beyond threshold.
+
+    Timings under `floor` ms on both sides are too noisy to flag.
+    """
+    print(f"{'case':26}{'state':6}{rev_a:>14}{rev_b:>14}{'delta':>9}")
+    worse = []
+    for name in CASES:
+        for s in STATES:
+            old, new = a[name][s]["p50_ms"], b[name][s]["p50_ms"]
+            delta = (new - old) / old * 100 if old else 0
+            mark = " !" if delta > threshold and max(old, new) >= floor else ""
+            print(f"{name:26}{s:6}{old:>14.3f}{new:>14.3f}{delta:>8.1f}%{mark}")
+            if mark:
+                worse.append((name, s, delta))
+    return worse
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Data layer benchmarks")
+    ap.add_argument("--iterations", type=int, default=30)
+    ap.add_argument("--latency", type=float, default=0, help="stand-in ms/request")
+    ap.add_argument("--jitter", type=float, default=0)
+    ap.add_argument("--compare", nargs=2, metavar=("REV_A", "REV_B"))
+    ap.add_argument("--threshold", type=float, default=10, help="regression %%")
+    ap.add_argument("--floor", type=float, default=0.1, help="ignore under ms")
+    ap.add_argument("--json", action="store_true", help="print a JSON report")
+    ap.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        worker(args.worker)
+        return
+
+    server, base = start_standin(args.latency, args.jitter)
+    try:
+        if not args.compare:
+            report = run_tree(ROOT, base, args.iterations)
+            if args.json:
+                print(json.dumps(report, indent=2))
+            else:
+                print_report(report)
+            return
+
+        reports = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for i, rev in enumerate(args.compare):
+                dest = os.path.join(tmp, f"rev{i}")
+                worktree(rev, dest)
+                try:
+                    reports.append(run_tree(dest, base, args.iterations))
+                finally:
+                    drop_worktree(dest)
+    finally:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(dict(zip(args.compare, reports)), indent=2))
+        return
+    worse = print_compare(*reports, *args.compare, args.threshold, args.floor)
+    if worse:
+        print(f"\n{len(worse)} regression(s) over {args.threshold:g}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
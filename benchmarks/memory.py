@@ -0,0 +1,125 @@
+"""
+Project Rotom - Memory Profile
+
+Drives the real App through a scripted browse session on a virtual display
+(same harness as benchmarks.ui) and reports, after each step, the live
+PhotoImages grouped by the cache that owns them and the tracemalloc growth
+since the previous step.
+
+    python -m benchmarks.memory --pages 10 --details 20
+    python -m benchmarks.memory --json > memory.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.ui import free_port, git_rev, start_display, start_standin
+
+
+def session(h, prof, args, steps):
+    """Scripted browse, recording a report after each step"""
+    from modules import memprof
+    from modules.pokeapi import get_pokemon
+
+    def mark(name):
+        h.settle()
+        prof.mark(name)
+        steps.append((name, memprof.photo_report(h.app)))
+
+    mark("launch")
+
+    h.app.show("PokedexFrame")
+    dex = h.frame("PokedexFrame")
+    mark("open_pokedex")
+
+    for _ in range(args.pages):
+        dex._page(1)
+        h.settle()
+    mark("browse_pages")
+
+    for i in range(args.details):
+        dex._detail(get_pokemon(i % 151 + 1))
+        h.settle()
+        dex._toggle_shiny()
+        h.settle()
+        dex._close_detail()
+        h.settle()
+    mark("open_details")
+
+    h.app.show("TeamBuilderFrame")
+    team = h.frame("TeamBuilderFrame")
+    team._open_dd(0)
+    h.settle()
+    for p in team.all_pokes[: args.details]:
+        team._filter_dd(p["name"][:2])
+        h.settle()
+    team._close_dd()
+    mark("team_dropdown")
+
+    h.app.show("HowToUseFrame")
+    mark("how_to_use")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Memory profile of a browse session")
+    ap.add_argument("--pages", type=int, default=10)
+    ap.add_argument("--details", type=int, default=10)
+    ap.add_argument("--top", type=int, default=10, help="allocation sites per step")
+    ap.add_argument("--frames", type=int, default=1, help="tracemalloc depth")
+    ap.add_argument("--json", action="store_true", help="print a JSON report")
+    args = ap.parse_args()
+
+    xvfb = start_display()
+    cache = tempfile.mkdtemp(prefix="rotom-mem-")
+
+    # Must be set before anything imports modules.constants
+    port = free_port()
+    os.environ["ROTOM_API_URL"] = f"http://127.0.0.1:{port}/api/v2"
+    os.environ["ROTOM_SPRITE_URL"] = f"http://127.0.0.1:{port}/sprites"
+    os.environ["ROTOM_CACHE_DIR"] = cache
+    server = start_standin(port, 0, 0)
+
+    from benchmarks.ui import Harness
+    from modules import memprof
+
+    # Tracing starts before the App so its own imports are in the baseline
+    prof = memprof.Session(args.frames)
+    steps = []
+    try:
+        h = Harness()
+        try:
+            session(h, prof, args, steps)
+        finally:
+            h.close()
+    finally:
+        server.shutdown()
+        if xvfb:
+            xvfb.terminate()
+        shutil.rmtree(cache, ignore_errors=True)
+
+    diffs = prof.diffs(args.top)
+    if args.json:
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": git_rev(),
+            "steps": [
+                {"step": name, "photos": photos, "tracemalloc": diffs[name]}
+                for name, photos in steps
+            ],
+        }
+        print(json.dumps(report, indent=2))
+        return
+
+    for name, photos in steps:
+        print(f"== {name}")
+        print(memprof.format_photos(photos))
+        print(memprof.format_diffs({name: diffs[name]}))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,545 @@
+"""
+Project Rotom - Local PokeAPI Stand-in
+
+Serves the PokeAPI endpoints and sprite paths the app uses, from recorded
+fixtures or deterministic synthetic data, with optional latency, jitter and
+failure injection:
+
+    python -m benchmarks.standin --port 8000 --latency 40 --jitter 20
+    ROTOM_API_URL=http://127.0.0.1:8000/api/v2 \\
+    ROTOM_SPRITE_URL=http://127.0.0.1:8000/sprites python main.py
+
+The app keeps a separate cache per API and sprite host, so a run against
+the stand-in never leaves synthetic data in the real app's cache.
+
+Record real responses once with --record (needs the internet), then replay
+them offline with --fixtures. --h2 serves HTTP/2 over cleartext (h2c with
+prior knowledge) instead of HTTP/1.1, for the transport benchmark.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import socketserver
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import urlsplit
+
+import requests
+from PIL import Image, ImageDraw
+
+from modules.constants import *
+
+UPSTREAM_API = "https://pokeapi.co/api/v2"
+UPSTREAM_SPRITES = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites"
+
+# Upstream URLs in recorded JSON are stored as these and filled in per request
+API_TOKEN = "{{api}}"
+SPRITES_TOKEN = "{{sprites}}"
+
+SYLLABLES = ["ra", "zu", "mi", "ko", "pi", "ta", "ne", "vo", "chu", "lo", "gar", "dra"]
+MOVES_PER_TYPE = 40
+LISTEN_BACKLOG = 128
+
+TYPES = [t.lower() for t in POKEMON_TYPES]
+
+
+# ==================== SYNTHETIC DATA ====================
+
+
+@lru_cache()
+def _names():
+    rng = random.Random("names")
+    names, seen = [], set()
+    for pid in range(1, TOTAL_POKEMON + 1):
+        while True:
+            name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+            if name not in seen:
+                break
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+@lru_cache()
+def _ids_by_name():
+    return {n: i + 1 for i, n in enumerate(_names())}
+
+
+@lru_cache(maxsize=None)
+def _types(pid):
+    rng = random.Random(f"types{pid}")
+    return rng.sample(TYPES, rng.choice((1, 2)))
+
+
+def _move_name(t, n):
+    return f"{t}-move-{n}"
+
+
+def _is_status(n):
+    return n % 5 == 0
+
+
+def synth_pokemon(pid, api, sprites):
+    rng = random.Random(f"poke{pid}")
+    moves = [
+        _move_name(rng.choice(TYPES), rng.randrange(MOVES_PER_TYPE)) for _ in range(20)
+    ]
+    stat_names = [
+        "hp",
+        "attack",
+        "defense",
+        "special-attack",
+        "special-defense",
+        "speed",
+    ]
+    return {
+        "id": pid,
+        "name": _names()[pid - 1],
+        "height": rng.randint(2, 30),
+        "weight": rng.randint(10, 2000),
+        "sprites": {
+            "front_default": f"{sprites}/pokemon/{pid}.png",
+            "front_shiny": f"{sprites}/pokemon/shiny/{pid}.png",
+        },
+        "types": [
+            {"slot": i + 1, "type": {"name": t, "url": f"{api}/type/{TYPE_IDS[t]}/"}}
+            for i, t in enumerate(_types(pid))
+        ],
+        "stats": [
+            {"base_stat": rng.randint(20, 150), "stat": {"name": s}} for s in stat_names
+        ],
+        "abilities": [{"ability": {"name": f"ability-{rng.randrange(300)}"}}],
+        "moves": [{"move": {"name": m, "url": f"{api}/move/{m}/"}} for m in moves],
+    }
+
+
+def synth_species(pid, api):
+    return {
+        "id": pid,
+        "name": _names()[pid - 1],
+        "flavor_text_entries": [
+            {
+                "flavor_text": f"Stand-in entry number {pid}.\nGenerated locally.",
+                "language": {"name": "en"},
+            }
+        ],
+        "genera": [{"genus": "Stand-in Pokémon", "language": {"name": "en"}}],
+        "evolution_chain": {"url": f"{api}/evolution-chain/{(pid - 1) // 3 + 1}/"},
+        "is_legendary": False,
+        "is_mythical": False,
+    }
+
+
+def synth_chain(cid, api):
+    first = (cid - 1) * 3 + 1
+    ids = [pid for pid in range(first, first + 3) if pid <= TOTAL_POKEMON]
+
+    node = None
+    for pid in reversed(ids):
+        node = {
+            "species": {
+                "name": _names()[pid - 1],
+                "url": f"{api}/pokemon-species/{pid}/",
+            },
+            "evolves_to": [node] if node else [],
+        }
+    return {"id": cid, "chain": node}
+
+
+def synth_type(name, api):
+    rng = random.Random(f"type{name}")
+    others = [t for t in TYPES if t != name]
+    rng.shuffle(others)
+    rel = lambda ts: [{"name": t, "url": f"{api}/type/{TYPE_IDS[t]}/"} for t in ts]
+
+    pokes = []
+    for pid in range(1, TOTAL_POKEMON + 1):
+        types = _types(pid)
+        if name in types:
+            pokes.append(
+                {
+                    "slot": types.index(name) + 1,
+                    "pokemon": {
+                        "name": _names()[pid - 1],
+                        "url": f"{api}/pokemon/{pid}/",
+                    },
+                }
+            )
+
+    return {
+        "id": TYPE_IDS[name],
+        "name": name,
+        "damage_relations": {
+            "double_damage_from": rel(others[:3]),
+            "half_damage_from": rel(others[3:6]),
+            "no_damage_from": rel(others[6:7] if rng.random() < 0.3 else []),
+        },
+        "pokemon": pokes,
+        "moves": [
+            {"name": _move_name(name, n), "url": f"{api}/move/{_move_name(name, n)}/"}
+            for n in range(MOVES_PER_TYPE)
+        ],
+    }
+
+
+def synth_status_moves(api):
+    moves = [
+        _move_name(t, n) for t in TYPES for n in range(MOVES_PER_TYPE) if _is_status(n)
+    ]
+    return {
+        "name": "status",
+        "moves": [{"name": m, "url": f"{api}/move/{m}/"} for m in moves],
+    }
+
+
+@lru_cache(maxsize=4096)
+def synth_image(path):
+    """Deterministic placeholder PNG or animated GIF for a sprite path"""
+    rng = random.Random(path)
+    color = tuple(rng.randrange(40, 256) for _ in range(3))
+
+    if "/types/" in path:
+        img = Image.new("RGBA", (200, 44), color + (255,))
+        buf = BytesIO()
+        img.save(buf, "PNG")
+        return buf.getvalue()
+
+    frames = []
+    for i in range(4 if path.endswith(".gif") else 1):
+        img = Image.new("RGBA", (96, 96), (0, 0, 0, 0))
+        r = 28 + 4 * i
+        box = (48 - r, 48 - r, 48 + r, 48 + r)
+        ImageDraw.Draw(img).ellipse(box, fill=color + (255,))
+        frames.append(img)
+
+    buf = BytesIO()
+    if path.endswith(".gif"):
+        frames[0].save(
+            buf, "GIF", save_all=True, append_images=frames[1:], duration=100, loop=0
+        )
+    else:
+        frames[0].save(buf, "PNG")
+    return buf.getvalue()
+
+
+def synthesize(path, query, api, sprites):
+    """(content type, body) for a request path, or None if unknown"""
+    parts = path.strip("/").split("/")
+
+    if parts[0] == "sprites":
+        if path.endswith((".png", ".gif")):
+            ctype = "image/gif" if path.endswith(".gif") else "image/png"
+            return ctype, synth_image(path)
+        return None
+
+    if parts[:2] != ["api", "v2"] or len(parts) < 3:
+        return None
+    kind, arg = parts[2], parts[3] if len(parts) > 3 else None
+
+    if kind == "pokemon" and arg is None:
+        params = dict(q.split("=", 1) for q in query.split("&") if "=" in q)
+        limit = int(params.get("limit", 20))
+        data = {
+            "count": TOTAL_POKEMON,
+            "results": [
+                {"name": n, "url": f"{api}/pokemon/{i + 1}/"}
+                for i, n in enumerate(_names()[:limit])
+            ],
+        }
+    elif kind in ("pokemon", "pokemon-species"):
+        pid = int(arg) if arg.isdigit() else _ids_by_name().get(arg)
+        if not pid or pid > TOTAL_POKEMON:
+            return None
+        if kind == "pokemon":
+            data = synth_pokemon(pid, api, sprites)
+        else:
+            data = synth_species(pid, api)
+    elif kind == "evolution-chain":
+        data = synth_chain(int(arg), api)
+    elif kind == "type":
+        by_id = {str(v): k for k, v in TYPE_IDS.items()}
+        name = arg if arg in TYPE_IDS else by_id.get(arg)
+        if not name:
+            return None
+        data = synth_type(name, api)
+    elif kind == "move-damage-class" and arg == "status":
+        data = synth_status_moves(api)
+    else:
+        return None
+
+    return "application/json", json.dumps(data).encode()
+
+
+# ==================== FIXTURES ====================
+
+
+def fixture_path(root, path, query):
+    name = path.strip("/")
+    if query:
+        name += "@" + query.replace("&", "_")
+    if not name.endswith((".png", ".gif")):
+        name += ".json"
+    return os.path.join(root, *name.split("/"))
+
+
+def load_fixture(root, path, query, api, sprites):
+    try:
+        with open(fixture_path(root, path, query), "rb") as f:
+            body = f.read()
+    except OSError:
+        return None
+
+    if path.endswith(".png"):
+        return "image/png", body
+    if path.endswith(".gif"):
+        return "image/gif", body
+    text = body.decode().replace(API_TOKEN, api).replace(SPRITES_TOKEN, sprites)
+    return "application/json", text.encode()
+
+
+def record(root, path, query):
+    """Fetch a path from the real hosts and save it as a fixture"""
+    if path.startswith("/sprites/"):
+        url = UPSTREAM_SPRITES + path[len("/sprites") :]
+    else:
+        url = UPSTREAM_API + path[len("/api/v2") :]
+    if query:
+        url += "?" + query
+
+    r = requests.get(url, timeout=15)
+    if r.status_code != 200:
+        return False
+
+    body = r.content
+    if not path.endswith((".png", ".gif")):
+        text = body.decode().replace(UPSTREAM_SPRITES, SPRITES_TOKEN)
+        body = text.replace(UPSTREAM_API, API_TOKEN).encode()
+
+    dest = fixture_path(root, path, query)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with open(dest, "wb") as f:
+        f.write(body)
+    return True
+
+
+# ==================== SERVER ====================
+
+
+def answer(server, target, host, head=False):
+    """(status, content type, body) for a request, or None to hang up"""
+    opts = server.opts
+    rng = server.rng
+
+    delay = opts.latency + rng.uniform(-opts.jitter, opts.jitter)
+    if delay > 0:
+        time.sleep(delay / 1000)
+
+    roll = rng.random()
+    if roll < opts.drop_rate:
+        return None
+    if roll < opts.drop_rate + opts.fail_rate:
+        return 503, "text/plain", b"injected failure"
+
+    url = urlsplit(target)
+    path, query = url.path.rstrip("/") or "/", url.query
+    base = f"http://{host or 'localhost'}"
+    api, sprites = f"{base}/api/v2", f"{base}/sprites"
+
+    res = None
+    if opts.fixtures:
+        res = load_fixture(opts.fixtures, path, query, api, sprites)
+        if res is None and opts.record:
+            with server.record_lock:
+                if record(opts.fixtures, path, query):
+                    res = load_fixture(opts.fixtures, path, query, api, sprites)
+    if res is None and not opts.no_synthetic:
+        res = synthesize(path, query, api, sprites)
+
+    if res is None:
+        return 404, "text/plain", b"Not Found"
+    return 200, res[0], res[1]
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Answers one HTTP/1.1 request; behaviour comes from the server's options"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; Nagle would hold the body
+    # back for the client's delayed ACK and add ~40 ms to every request
+    disable_nagle_algorithm = True
+
+    def do_HEAD(self):
+        self._respond(head=True)
+
+    def do_GET(self):
+        self._respond()
+
+    def _respond(self, head=False):
+        res = answer(self.server, self.path, self.headers.get("Host"), head)
+        if res is None:
+            # Hang up without answering, seen by clients as a connection error
+            self.close_connection = True
+            return
+
+        status, ctype, body = res
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        if self.server.opts.verbose:
+            super().log_message(fmt, *args)
+
+
+class H2Handler(socketserver.BaseRequestHandler):
+    """One cleartext HTTP/2 connection (h2c with prior knowledge).
+
+    Each stream is answered on its own thread so injected latency overlaps
+    the way it does on a multiplexed connection to a real host.
+    """
+
+    def handle(self):
+        from h2.config import H2Configuration
+        from h2.connection import H2Connection
+        from h2 import events
+
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.conn = H2Connection(
+            H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.cond = threading.Condition()
+        with self.cond:
+            self.conn.initiate_connection()
+            self._flush()
+
+        while True:
+            try:
+                data = self.request.recv(65535)
+            except OSError:
+                data = b""
+            with self.cond:
+                if not data:
+                    self.cond.notify_all()
+                    return
+                evs = self.conn.receive_data(data)
+                self._flush()
+                # Window updates may unblock streams waiting to send
+                self.cond.notify_all()
+
+            for ev in evs:
+                if isinstance(ev, events.RequestReceived):
+                    threading.Thread(
+                        target=self._stream,
+                        args=(ev.stream_id, dict(ev.headers)),
+                        daemon=True,
+                    ).start()
+                elif isinstance(ev, events.ConnectionTerminated):
+                    return
+
+    def _stream(self, sid, headers):
+        from h2.exceptions import ProtocolError
+
+        head = headers.get(":method") == "HEAD"
+        res = answer(self.server, headers[":path"], headers.get(":authority"), head)
+        try:
+            with self.cond:
+                if res is None:
+                    self.conn.reset_stream(sid)
+                    self._flush()
+                    return
+                self._send(sid, *res, head)
+        except (ProtocolError, OSError):
+            pass
+
+    def _send(self, sid, status, ctype, body, head):
+        """Sends a response within flow control; caller holds self.cond"""
+        fields = [
+            (":status", str(status)),
+            ("content-type", ctype),
+            ("content-length", str(len(body))),
+        ]
+        body = b"" if head else body
+        self.conn.send_headers(sid, fields, end_stream=not body)
+        self._flush()
+
+        while body:
+            window = self.conn.local_flow_control_window(sid)
+            size = min(window, self.conn.max_outbound_frame_size, len(body))
+            if size <= 0:
+                self.cond.wait(1)
+                continue
+            self.conn.send_data(sid, body[:size], end_stream=size == len(body))
+            body = body[size:]
+            self._flush()
+
+    def _flush(self):
+        self.request.sendall(self.conn.data_to_send())
+
+
+class H2Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+class H1Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops SYNs when a page opens many connections
+    request_queue_size = LISTEN_BACKLOG
+
+
+def serve(opts):
+    if opts.h2:
+        try:
+            import h2
+        except ImportError:
+            raise SystemExit("--h2 needs the h2 package (pip install '.[http2]')")
+        server = H2Server((opts.host, opts.port), H2Handler)
+    else:
+        server = H1Server((opts.host, opts.port), StandinHandler)
+    server.opts = opts
+    server.rng = random.Random(opts.seed)
+    server.record_lock = threading.Lock()
+    return server
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Local PokeAPI stand-in server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--latency", type=float, default=0, help="ms added per request")
+    ap.add_argument("--jitter", type=float, default=0, help="± ms around --latency")
+    ap.add_argument("--fail-rate", type=float, default=0, help="share answered 503")
+    ap.add_argument("--drop-rate", type=float, default=0, help="share hung up on")
+    ap.add_argument("--fixtures", help="directory of recorded responses")
+    ap.add_argument("--record", action="store_true", help="record misses upstream")
+    ap.add_argument("--no-synthetic", action="store_true", help="404 on fixture miss")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--h2", action="store_true", help="HTTP/2 cleartext (h2c) only")
+    ap.add_argument("--verbose", action="store_true")
+    return ap.parse_args(argv)
+
+
+def main():
+    opts = parse_args()
+    server = serve(opts)
+    base = f"http://{opts.host}:{server.server_port}"
+    print(f"Stand-in on {base}" + (" (h2c, prior knowledge)" if opts.h2 else ""))
+    print(f"  ROTOM_API_URL={base}/api/v2 ROTOM_SPRITE_URL={base}/sprites")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Project Rotom - HTTP Transport Benchmark
+
+Page-load latency of the sprite fetch transports:
+
+    requests          one shared requests.Session (HTTP/1.1 keep-alive)
+    requests-oneshot  a plain requests.get per sprite (new connection each)
+    http2             the httpx HTTP/2 transport, one multiplexed connection
+
+By default two local stand-ins with the same --latency are started, an
+HTTP/1.1 one for requests and an h2c one for httpx, and the http2 run fails
+if the connection did not actually negotiate HTTP/2:
+
+    python -m benchmarks.transport --latency 30
+    python -m benchmarks.transport --base-url https://example.org/sprites
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from modules.constants import *
+from modules.net import HTTP2Transport, RequestsTransport
+
+TRANSPORTS = ("requests", "requests-oneshot", "http2")
+
+
+class OneShotTransport:
+    """requests.get per call, so every sprite pays for a fresh connection"""
+
+    name = "requests-oneshot"
+
+    def get(self, url, timeout):
+        r = requests.get(url, timeout=timeout)
+        return r.status_code, r.content
+
+
+def make(name, base_url):
+    """Transport for `name`, or None when its dependency is missing"""
+    if name == "requests":
+        return RequestsTransport()
+    if name == "requests-oneshot":
+        return OneShotTransport()
+    try:
+        return HTTP2Transport(prior_knowledge=base_url.startswith("http://"))
+    except ImportError:
+        return None
+
+
+def load_page(transport, pool, urls, timeout):
+    """Fetch one page of sprites at once, returns the wall time in ms"""
+    start = time.perf_counter()
+    for status, _ in pool.map(lambda u: transport.get(u, timeout), urls):
+        if status >= 400:
+            raise RuntimeError(f"HTTP {status}")
+    return (time.perf_counter() - start) * 1000
+
+
+def run(name, base_url, pages, per_page, workers, timeout):
+    transport = make(name, base_url)
+    if transport is None:
+        return None
+
+    # One request up front so connection setup is not billed to page one
+    if name == "http2":
+        version = transport.client.get(f"{base_url}/1.png").http_version
+        if version != "HTTP/2":
+            sys.exit(f"http2 transport negotiated {version}, not HTTP/2")
+    else:
+        transport.get(f"{base_url}/1.png", timeout)
+
+    times = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for p in range(pages):
+            first = p * per_page + 1
+            urls = [f"{base_url}/{pid}.png" for pid in range(first, first + per_page)]
+            times.append(load_page(transport, pool, urls, timeout))
+
+    times.sort()
+    return {
+        "pages": pages,
+        "per_page": per_page,
+        "mean_ms": round(statistics.mean(times), 2),
+        "p50_ms": round(times[len(times) // 2], 2),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 2),
+    }
+
+
+def start_standin(latency, h2):
+    from benchmarks.standin import parse_args, serve
+
+    argv = ["--port", "0", "--latency", str(latency)] + (["--h2"] if h2 else [])
+    server = serve(parse_args(argv))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/sprites/pokemon"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="HTTP transport benchmark")
+    ap.add_argument("--base-url", help="real sprite host (default: local stand-ins)")
+    ap.add_argument("--latency", type=float, default=30, help="stand-in ms/request")
+    ap.add_argument("--pages", type=int, default=50)
+    ap.add_argument("--per-page", type=int, default=24)
+    ap.add_argument("--workers", type=int, default=SCHED_WORKERS)
+    ap.add_argument("--timeout", type=float, default=5)
+    ap.add_argument("--json", action="store_true", help="print a JSON report")
+    args = ap.parse_args()
+
+    servers = []
+    if not args.base_url:
+        from benchmarks.standin import synth_image
+
+        # Draw the sprites up front so no transport is billed for it
+        for pid in range(1, args.pages * args.per_page + 2):
+            synth_image(f"/sprites/pokemon/{pid}.png")
+
+    if args.base_url:
+        urls = dict.fromkeys(TRANSPORTS, args.base_url)
+    else:
+        h1, h1_url = start_standin(args.latency, h2=False)
+        servers.append(h1)
+        urls = {"requests": h1_url, "requests-oneshot": h1_url}
+        try:
+            h2, urls["http2"] = start_standin(args.latency, h2=True)
+            servers.append(h2)
+        except SystemExit:
+            urls["http2"] = None
+
+    report = {}
+    try:
+        for name in TRANSPORTS:
+            report[name] = urls[name] and run(
+                name,
+                urls[name],
+                args.pages,
+                args.per_page,
+                args.workers,
+                args.timeout,
+            )
+    finally:
+        for server in servers:
+            server.shutdown()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for name, res in report.items():
+        if res is None:
+            print(f"{name:17} unavailable (pip install '.[http2]')")
+        else:
+            print(
+                f"{name:17} mean {res['mean_ms']:8.1f} ms"
+                f"  p50 {res['p50_ms']:8.1f} ms  p95 {res['p95_ms']:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Project Rotom - Headless UI Benchmarks
+
+Drives the real App on a virtual display (Xvfb) against the local stand-in
+and times the interactions users feel: page flips, opening a detail view,
+the shiny toggle, typing in the team dropdown and opening analytics. Each
+sample is the wall time from the call until Tk has no events ready and the
+background scheduler has nothing pending.
+
+    python -m benchmarks.ui --repeat 10 --out ui.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+IDLE_TIMEOUT = 30
+
+
+def start_display():
+    """Start Xvfb unless a display is already available, returns the process"""
+    if os.environ.get("DISPLAY"):
+        return None
+    if not shutil.which("Xvfb"):
+        sys.exit("No DISPLAY and Xvfb is not installed")
+
+    for n in range(99, 120):
+        if os.path.exists(f"/tmp/.X11-unix/X{n}"):
+            continue
+        proc = subprocess.Popen(
+            ["Xvfb", f":{n}", "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        for _ in range(50):
+            if os.path.exists(f"/tmp/.X11-unix/X{n}"):
+                os.environ["DISPLAY"] = f":{n}"
+                return proc
+            time.sleep(0.1)
+        proc.kill()
+    sys.exit("Could not start Xvfb")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_standin(port, latency, jitter):
+    from benchmarks.standin import parse_args, serve
+
+    opts = ["--port", str(port), "--latency", str(latency), "--jitter", str(jitter)]
+    server = serve(parse_args(opts))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Harness:
+    """Owns the App and times calls until the UI settles"""
+
+    def __init__(self):
+        import _tkinter
+        from modules.app import App
+
+        self.flags = _tkinter.ALL_EVENTS | _tkinter.DONT_WAIT
+        self.app = App()
+        self.samples = {}
+        self.settle()
+
+    def settle(self):
+        end = time.perf_counter() + IDLE_TIMEOUT
+        while time.perf_counter() < end:
+            if self.app.tk.dooneevent(self.flags):
+                continue
+            if not self.app.sched.pending:
+                return
+            time.sleep(0.001)
+        raise TimeoutError("UI did not settle")
+
+    def time(self, name, fn, *args):
+        start = time.perf_counter()
+        fn(*args)
+        self.settle()
+        ms = (time.perf_counter() - start) * 1000
+        self.samples.setdefault(name, []).append(ms)
+        return ms
+
+    def frame(self, name):
+        return self.app.frames[name]
+
+    def close(self):
+        self.app.destroy()
+
+
+def scenario(h, repeat):
+    from modules.pokeapi import get_pokemon
+
+    h.time("open_pokedex", h.app.show, "PokedexFrame")
+    dex = h.frame("PokedexFrame")
+
+    for _ in range(repeat):
+        h.time("page_next", dex._page, 1)
+    for _ in range(repeat):
+        h.time("page_prev", dex._page, -1)
+
+    for i in range(repeat):
+        poke = get_pokemon(i % 151 + 1)
+        h.time("detail_open", dex._detail, poke)
+        h.time("shiny_on", dex._toggle_shiny)
+        h.time("shiny_off", dex._toggle_shiny)
+        h.time("detail_close", dex._close_detail)
+
+    h.time("open_team_builder", h.app.show, "TeamBuilderFrame")
+    team = h.frame("TeamBuilderFrame")
+    team._open_dd(0)
+    h.settle()
+
+    # One keystroke at a time, as the search entry reports them
+    names = [p["name"] for p in team.all_pokes[:repeat]] or ["a"]
+    for name in names:
+        for n in range(1, min(len(name), 4) + 1):
+            h.time("dropdown_type", team._filter_dd, name[:n])
+    team._close_dd()
+
+    team.team = [get_pokemon(pid) for pid in (1, 4, 7, 25, 39, 52)]
+    for _ in range(repeat):
+        h.time("analytics_open", team._show_ana)
+        h.time("analytics_close", team._close_ana)
+
+
+def summarise(samples):
+    out = {}
+    for name, times in samples.items():
+        times = sorted(times)
+        out[name] = {
+            "n": len(times),
+            "mean_ms": round(statistics.mean(times), 2),
+            "p50_ms": round(times[len(times) // 2], 2),
+            "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 2),
+            "max_ms": round(times[-1], 2),
+        }
+    return out
+
+
+def git_rev():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Headless UI benchmarks")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--latency", type=float, default=0, help="stand-in ms/request")
+    ap.add_argument("--jitter", type=float, default=0)
+    ap.add_argument("--cache-dir", help="reuse this cache (default: a fresh one)")
+    ap.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = ap.parse_args()
+
+    xvfb = start_display()
+    cache = args.cache_dir or tempfile.mkdtemp(prefix="rotom-ui-")
+
+    # Must be set before anything imports modules.constants
+    port = free_port()
+    os.environ["ROTOM_API_URL"] = f"http://127.0.0.1:{port}/api/v2"
+    os.environ["ROTOM_SPRITE_URL"] = f"http://127.0.0.1:{port}/sprites"
+    os.environ["ROTOM_CACHE_DIR"] = cache
+    server = start_standin(port, args.latency, args.jitter)
+
+    try:
+        h = Harness()
+        try:
+            scenario(h, args.repeat)
+        finally:
+            h.close()
+    finally:
+        server.shutdown()
+        if xvfb:
+            xvfb.terminate()
+        if not args.cache_dir:
+            shutil.rmtree(cache, ignore_errors=True)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": git_rev(),
+        "python": platform.python_version(),
+        "latency_ms": args.latency,
+        "repeat": args.repeat,
+        "cases": summarise(h.samples),
+    }
+
+    data = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+
+
+if __name__ == "__main__":
+    main()
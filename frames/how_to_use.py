@@ -1,7 +1,9 @@
 import tkinter as tk
 from modules.constants import *
 from modules.gif_player import GIFPlayer
-from PIL import Image, ImageTk
+from modules.image_cache import images
+from modules.trace import traced
+from PIL import Image
 
 # Shortcuts
 BG = BG_COLOR
@@ -23,7 +25,6 @@ class HowToUseFrame(tk.Frame):
         # Widgets
         self.wgts = []
         self.bg_lbl = None
-        self.img_cache = {}
 
     # ==================== LIFECYCLE ====================
 
@@ -71,17 +72,10 @@ class HowToUseFrame(tk.Frame):
             except:
                 pass
 
+    @traced("image")
     def _load_img(self, path, size=None, resample=Image.LANCZOS):
-        key = f"{path}_{size}_{resample}"
-        if key in self.img_cache:
-            return self.img_cache[key]
         try:
-            img = Image.open(path)
-            if size:
-                img = img.resize(size, resample)
-            photo = ImageTk.PhotoImage(img)
-            self.img_cache[key] = photo
-            return photo
+            return images.load(path, size, resample)
         except Exception as e:
             print(f"Error loading image {path}: {e}")
             return None
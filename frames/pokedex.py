@@ -12,8 +12,11 @@ from modules.pokeapi import (
     PokeAPIError,
 )
 from modules.error_handler import ErrorHandler
+from modules.image_cache import ImageKey, images, type_key
+from modules.sprites import fetch_image, fetch_bytes
+from modules import net
+from modules.trace import traced
 from PIL import Image, ImageTk
-import requests
 from io import BytesIO
 
 # Shortcuts
@@ -37,6 +40,7 @@ class PokedexFrame(tk.Frame):
         self.in_detail = False
         self.shiny = False
         self.cur_poke = None
+        self.offline_page = False
 
         # Widgets
         self.wgts = []
@@ -46,11 +50,9 @@ class PokedexFrame(tk.Frame):
         self.sprite_lbl = None
         self.shiny_btn = None
 
-        # Caches
-        self.type_cache = {}
-        self.img_cache = {}
-        self.anim_cache = {}
-        self.shiny_cache = {}
+        # Scheduler owner of the current detail view's background loads
+        self.view_gen = 0
+        self.switch_task = None
 
     # ==================== LIFECYCLE ====================
 
@@ -72,6 +74,7 @@ class PokedexFrame(tk.Frame):
 
     def _reset(self):
         self._stop_all()
+        self._new_view()
         self.err.close()
         self._destroy(self.wgts)
         if self.back_btn:
@@ -88,6 +91,7 @@ class PokedexFrame(tk.Frame):
         self.cur_poke = None
         self.sprite_lbl = None
         self.shiny_btn = None
+        self.offline_page = False
 
     def _clean_menu(self):
         menu = self.ctrl.frames.get("AppMenuFrame")
@@ -107,41 +111,38 @@ class PokedexFrame(tk.Frame):
             except:
                 pass
 
+    @traced("image")
     def _load_img(self, path, size, resample=Image.NEAREST):
-        key = f"{path}_{size}_{resample}"
-        if key in self.img_cache:
-            return self.img_cache[key]
         try:
-            img = Image.open(path).resize(size, resample)
-            photo = ImageTk.PhotoImage(img)
-            self.img_cache[key] = photo
-            return photo
+            return images.load(path, size, resample)
         except:
             return None
 
+    @traced("image")
     def _fetch(self, url, size, fallback=False):
         """Fetch image from URL. If fallback=True, return error.png on failure"""
+        key = ImageKey("sprite", url, size)
+        photo = images.get(key)
+        if photo:
+            return photo
         try:
-            r = requests.get(url, timeout=5)
-            r.raise_for_status()
-            img = Image.open(BytesIO(r.content)).resize(size, Image.NEAREST)
-            return ImageTk.PhotoImage(img)
+            return images.put(key, ImageTk.PhotoImage(fetch_image(url, size)))
         except:
             if fallback:
                 return self._load_img(ERROR_IMG, size)
             return None
 
     def _type_icon(self, name):
-        if name in self.type_cache:
-            return self.type_cache[name]
+        key = type_key(name)
+        photo = images.get(key)
+        if photo:
+            return photo
         try:
             url = get_type_icon_url(name)
             if not url:
                 return None
-            photo = self._fetch(url, TYPE_ICON_SIZE, fallback=False)
-            if photo:
-                self.type_cache[name] = photo
-            return photo
+            img = fetch_image(url, TYPE_ICON_SIZE)
+            return images.put(key, ImageTk.PhotoImage(img))
         except:
             return None
 
@@ -158,45 +159,54 @@ class PokedexFrame(tk.Frame):
 
     # ==================== ANIMATION ====================
 
+    @traced("image")
     def _get_anim(self, pid, size, shiny=False):
-        cache = self.shiny_cache if shiny else self.anim_cache
-        prefix = "shiny_" if shiny else ""
-        key = f"{prefix}{pid}_{size}"
-
-        if key in cache:
-            return cache[key]
+        data = images.get(self._anim_key(pid, size, shiny))
+        if data:
+            return data
 
         if pid > MAX_ANIMATED_ID:
             return None
 
+        decoded = self._decode_anim(pid, size, shiny)
+        if decoded:
+            return self._anim_photos(decoded, size, shiny)
+        return None
+
+    def _anim_key(self, pid, size, shiny):
+        return ImageKey("anim", pid, size, "shiny" if shiny else None)
+
+    def _decode_anim(self, pid, size, shiny=False):
+        """Download and resize animation frames. Safe off the Tk thread"""
         base_url = SHINY_ANIMATED_SPRITE_URL if shiny else ANIMATED_SPRITE_URL
         url = f"{base_url}/{pid}.gif"
 
         try:
-            r = requests.get(url, timeout=5)
-            r.raise_for_status()
-
-            gif = Image.open(BytesIO(r.content))
+            gif = Image.open(BytesIO(fetch_bytes(url)))
             frames, durs = [], []
 
             try:
                 while True:
-                    frames.append(
-                        ImageTk.PhotoImage(gif.copy().resize(size, Image.NEAREST))
-                    )
+                    frames.append(gif.copy().resize(size, Image.NEAREST))
                     durs.append(gif.info.get("duration", 100))
                     gif.seek(gif.tell() + 1)
             except EOFError:
                 pass
 
             if frames:
-                data = {"frames": frames, "durations": durs}
-                cache[key] = data
-                return data
+                return {"pid": pid, "frames": frames, "durations": durs}
         except:
             pass
         return None
 
+    def _anim_photos(self, decoded, size, shiny=False):
+        """Turn decoded frames into cached PhotoImages (Tk thread only)"""
+        data = {
+            "frames": [ImageTk.PhotoImage(f) for f in decoded["frames"]],
+            "durations": decoded["durations"],
+        }
+        return images.put(self._anim_key(decoded["pid"], size, shiny), data)
+
     def _animate(self, lbl):
         if not hasattr(lbl, "frames") or not lbl.winfo_exists():
             return
@@ -259,26 +269,52 @@ class PokedexFrame(tk.Frame):
                 lbl.image = photo
 
     def _load_detail_sprite(self, poke, lbl, size=DETAIL_SPRITE_SIZE):
-        pid = poke["id"]
+        shiny = self.shiny
+        data = images.get(self._anim_key(poke["id"], size, shiny))
+        if data:
+            self._start_anim(lbl, data)
+            return
 
-        if self.shiny:
-            data = self._get_anim(pid, size, shiny=True)
-            if data:
-                self._start_anim(lbl, data)
-                return
-            url = poke.get("sprite_shiny_url")
-            if url:
-                photo = self._fetch(url, size, fallback=True)
-                if photo:
-                    lbl.configure(image=photo)
-                    lbl.image = photo
-                    return
-        else:
-            data = self._get_anim(pid, size)
-            if data:
-                self._start_anim(lbl, data)
-                return
-            photo = self._fetch(poke["sprite_url"], size, fallback=True)
+        lbl.configure(text="Loading...", font=SECTION_FONT, fg=MUTED_COLOR)
+        self._load_async(
+            self._sprite_job,
+            (poke, size, shiny),
+            lambda res: self._show_detail_sprite(lbl, size, shiny, res),
+            widget=lbl,
+        )
+
+    def _sprite_job(self, poke, size, shiny):
+        """Worker: decoded animation if there is one, else the static sprite"""
+        if poke["id"] <= MAX_ANIMATED_ID:
+            decoded = self._decode_anim(poke["id"], size, shiny)
+            if decoded:
+                return "anim", decoded
+
+        url = poke.get("sprite_shiny_url") if shiny else poke["sprite_url"]
+        if not url:
+            return "none", None
+        if ImageKey("sprite", url, size) in images:
+            return "static", (url, None)
+        try:
+            return "static", (url, fetch_image(url, size))
+        except Exception:
+            return "static", (url, None)
+
+    def _show_detail_sprite(self, lbl, size, shiny, res):
+        # Shiny was toggled again while this one was loading
+        if shiny != self.shiny:
+            return
+
+        kind, val = res
+        lbl.configure(text="")
+        if kind == "anim":
+            self._start_anim(lbl, self._anim_photos(val, size, shiny))
+        elif kind == "static":
+            url, img = val
+            key = ImageKey("sprite", url, size)
+            if img:
+                images.put(key, ImageTk.PhotoImage(img))
+            photo = images.get(key) or self._load_img(ERROR_IMG, size)
             if photo:
                 lbl.configure(image=photo)
                 lbl.image = photo
@@ -457,6 +493,7 @@ class PokedexFrame(tk.Frame):
 
     # ==================== DISPLAY ====================
 
+    @traced("render")
     def _show_page(self):
         self._stop_all()
         self._destroy(self.wgts[3:])
@@ -468,6 +505,7 @@ class PokedexFrame(tk.Frame):
 
         start = self.page * CARDS_PER_PAGE
         items = self.filtered[start : start + CARDS_PER_PAGE]
+        self.offline_page = False
 
         for i, item in enumerate(items):
             try:
@@ -475,6 +513,11 @@ class PokedexFrame(tk.Frame):
                 if poke:
                     self._card(poke, i)
             except NetworkError as e:
+                if net.is_offline() and isinstance(item, int):
+                    # Not cached: grey the entry out and carry on
+                    self._offline_card(item, i)
+                    self.offline_page = True
+                    continue
                 self.wgts.append(self.err.show(str(e), self._show_page))
                 return
             except PokeAPIError as e:
@@ -482,6 +525,21 @@ class PokedexFrame(tk.Frame):
                 return
 
         self._nav_btns()
+        self._prefetch_page(self.page + 1)
+
+    def _prefetch_page(self, page):
+        """Warm the next page's data in the prefetch lane"""
+        self.ctrl.sched.cancel(("PokedexFrame", "prefetch"))
+
+        start = page * CARDS_PER_PAGE
+        for item in self.filtered[start : start + CARDS_PER_PAGE]:
+            if isinstance(item, int):
+                self.ctrl.sched.submit(
+                    get_pokemon,
+                    item,
+                    owner=("PokedexFrame", "prefetch"),
+                    priority=PRIO_PREFETCH,
+                )
 
     def _card(self, poke, idx):
         x = CARD_START_X + (idx % 3) * CARD_SPACING_X
@@ -554,6 +612,29 @@ class PokedexFrame(tk.Frame):
                 lbl.pack(side=tk.LEFT, padx=3)
                 lbl.bind("<Button-1>", detail)
 
+    def _offline_card(self, pid, idx):
+        x = CARD_START_X + (idx % 3) * CARD_SPACING_X
+        y = CARD_START_Y + (idx // 3) * CARD_SPACING_Y
+
+        card = tk.Frame(
+            self.ctrl,
+            bg=OFFLINE_CARD_BG,
+            width=CARD_WIDTH,
+            height=CARD_HEIGHT,
+            highlightbackground=OFFLINE_CARD_BG,
+            highlightthickness=3,
+        )
+        card.pack_propagate(False)
+        card.place(x=x, y=y)
+        self.wgts.append(card)
+
+        tk.Label(
+            card, text=f"#{pid}", font=POKE_ID_FONT, fg=MUTED_COLOR, bg=OFFLINE_CARD_BG
+        ).pack(expand=True, anchor="s")
+        tk.Label(
+            card, text="Offline", font=POKE_ID_FONT, fg=MUTED_COLOR, bg=OFFLINE_CARD_BG
+        ).pack(expand=True, anchor="n")
+
     def _card_enter(self, poke, lbl, static, card):
         data = self._get_anim(poke["id"], CARD_ANIM_SIZE)
         if data:
@@ -632,8 +713,70 @@ class PokedexFrame(tk.Frame):
 
     # ==================== DETAIL VIEW ====================
 
+    def _view_owner(self):
+        return ("PokedexFrame", "detail", self.view_gen)
+
+    def _new_view(self):
+        """Drop background loads that belong to the view being left"""
+        self.ctrl.sched.cancel(self._view_owner())
+        self.view_gen += 1
+
+    def _load_async(self, fn, args, on_done, on_error=None, widget=None):
+        """Run fn(*args) in the background for the current view only"""
+        return self.ctrl.sched.submit(
+            fn,
+            *args,
+            on_done=on_done,
+            on_error=on_error,
+            owner=self._view_owner(),
+            priority=PRIO_INTERACTIVE,
+            widget=widget,
+        )
+
+    def _blank(self, size):
+        """Transparent placeholder that reserves a sprite's space"""
+        key = ImageKey("blank", None, size)
+        return images.get(key) or images.put(
+            key, tk.PhotoImage(width=size[0], height=size[1])
+        )
+
+    def _icon_row(self, row, types, padx):
+        """Place type icons in order, fetching uncached ones in the background"""
+        for t in types:
+            lbl = tk.Label(row, bg=CARD_BG)
+            lbl.pack(side=tk.LEFT, padx=padx)
+
+            icon = images.get(type_key(t))
+            if icon:
+                lbl.configure(image=icon)
+                lbl.image = icon
+            else:
+                self._load_async(
+                    self._icon_job,
+                    (t,),
+                    lambda img, t=t, l=lbl: self._show_icon(l, t, img),
+                    lambda e, l=lbl: l.destroy(),
+                    widget=lbl,
+                )
+
+    def _icon_job(self, name):
+        url = get_type_icon_url(name)
+        return fetch_image(url, TYPE_ICON_SIZE) if url else None
+
+    def _show_icon(self, lbl, name, img):
+        key = type_key(name)
+        icon = images.get(key)
+        if not icon:
+            if img is None:
+                lbl.destroy()
+                return
+            icon = images.put(key, ImageTk.PhotoImage(img))
+        lbl.configure(image=icon)
+        lbl.image = icon
+
     def _detail(self, poke):
         self._stop_all()
+        self._new_view()
         self.in_detail = True
         self.shiny = False
         self.cur_poke = poke
@@ -708,12 +851,7 @@ class PokedexFrame(tk.Frame):
 
         row = tk.Frame(card, bg=CARD_BG)
         row.pack(pady=(20, 0))
-        for t in poke.get("types", []):
-            icon = self._type_icon(t)
-            if icon:
-                lbl = tk.Label(row, image=icon, bg=CARD_BG)
-                lbl.image = icon
-                lbl.pack(side=tk.LEFT, padx=8)
+        self._icon_row(row, poke.get("types", []), 8)
 
     def _right_card(self, poke):
         card = tk.Frame(
@@ -726,28 +864,66 @@ class PokedexFrame(tk.Frame):
         card.place(x=DETAIL_RIGHT_X, y=DETAIL_Y)
         self.wgts.append(card)
 
-        desc = get_pokemon_description(poke["id"])
-        if desc:
-            if len(desc) > DESC_MAX_LEN:
-                desc = desc[: DESC_MAX_LEN - 3] + "..."
-            tk.Label(
-                card,
-                text=desc,
-                font=SECTION_FONT,
-                fg=TXT,
-                bg=CARD_BG,
-                wraplength=360,
-                justify=tk.LEFT,
-            ).pack(pady=(20, 10), padx=20, anchor="w")
+        # Sections keep their slot but fill in whichever order they arrive
+        desc_fr = self._section_fr(card)
+        weak_fr = self._section_fr(card)
+        evo_fr = self._section_fr(card)
+
+        self._load_async(
+            get_pokemon_description,
+            (poke["id"],),
+            lambda desc: self._desc_section(desc_fr, desc),
+            lambda e: desc_fr.destroy(),
+        )
+        self._load_async(
+            get_pokemon_weaknesses,
+            (poke.get("types", []),),
+            lambda weak: self._weak_section(weak_fr, weak),
+            lambda e: weak_fr.destroy(),
+        )
+        self._load_async(
+            get_evolution_chain,
+            (poke["id"],),
+            lambda evos: self._evo_section(evo_fr, poke, evos),
+            lambda e: evo_fr.destroy(),
+        )
 
-        self._weak_section(card, poke)
-        self._evo_section(card, poke)
+    def _section_fr(self, parent):
+        fr = tk.Frame(parent, bg=CARD_BG)
+        fr.pack(fill="x")
+        tk.Label(
+            fr, text="Loading...", font=EVO_NAME_FONT, fg=MUTED_COLOR, bg=CARD_BG
+        ).pack(pady=(10, 0), padx=20, anchor="w")
+        return fr
+
+    def _clear_section(self, fr):
+        for w in fr.winfo_children():
+            w.destroy()
+
+    def _desc_section(self, parent, desc):
+        if not desc:
+            parent.destroy()
+            return
+
+        self._clear_section(parent)
+        if len(desc) > DESC_MAX_LEN:
+            desc = desc[: DESC_MAX_LEN - 3] + "..."
+        tk.Label(
+            parent,
+            text=desc,
+            font=SECTION_FONT,
+            fg=TXT,
+            bg=CARD_BG,
+            wraplength=360,
+            justify=tk.LEFT,
+        ).pack(pady=(20, 10), padx=20, anchor="w")
 
-    def _weak_section(self, parent, poke):
-        weak = get_pokemon_weaknesses(poke.get("types", []))
+    def _weak_section(self, parent, weak):
         if not weak:
+            parent.destroy()
             return
 
+        self._clear_section(parent)
         fr = tk.Frame(parent, bg=CARD_BG)
         fr.pack(pady=(10, 5), padx=20, anchor="w", fill="x")
 
@@ -755,23 +931,17 @@ class PokedexFrame(tk.Frame):
             anchor="w"
         )
 
-        row = None
-        for i, t in enumerate(weak):
-            if i % WEAK_PER_ROW == 0:
-                row = tk.Frame(fr, bg=CARD_BG)
-                row.pack(anchor="w", pady=(2, 0))
-
-            icon = self._type_icon(t)
-            if icon:
-                lbl = tk.Label(row, image=icon, bg=CARD_BG)
-                lbl.image = icon
-                lbl.pack(side=tk.LEFT, padx=2)
+        for i in range(0, len(weak), WEAK_PER_ROW):
+            row = tk.Frame(fr, bg=CARD_BG)
+            row.pack(anchor="w", pady=(2, 0))
+            self._icon_row(row, weak[i : i + WEAK_PER_ROW], 2)
 
-    def _evo_section(self, parent, poke):
-        evos = get_evolution_chain(poke["id"])
+    def _evo_section(self, parent, poke, evos):
         if len(evos) <= 1:
+            parent.destroy()
             return
 
+        self._clear_section(parent)
         cont = tk.Frame(parent, bg=CARD_BG)
         cont.pack(pady=(15, 10), padx=20, anchor="w", fill="x")
 
@@ -814,72 +984,127 @@ class PokedexFrame(tk.Frame):
         )
         cont.pack(side=tk.LEFT)
 
-        photo = self._fetch(evo["sprite_url"], EVO_SPRITE_SIZE, fallback=True)
-        if photo:
-            is_cur = evo["id"] == cur_id
-            hl = GOLD_COLOR if is_cur else CARD_BG
+        is_cur = evo["id"] == cur_id
+        hl = GOLD_COLOR if is_cur else CARD_BG
 
-            spr = tk.Label(
-                cont,
-                image=photo,
-                bg=CARD_BG,
-                cursor="arrow" if is_cur else "hand2",
-                highlightbackground=hl,
-                highlightthickness=2,
-            )
-            spr.image = photo
-            spr.pack(padx=3, pady=3)
+        # Blank placeholder keeps the strip's layout fixed until the sprite lands
+        blank = self._blank(EVO_SPRITE_SIZE)
+        spr = tk.Label(
+            cont,
+            image=blank,
+            bg=CARD_BG,
+            cursor="arrow" if is_cur else "hand2",
+            highlightbackground=hl,
+            highlightthickness=2,
+        )
+        spr.image = blank
+        spr.pack(padx=3, pady=3)
 
-            name = tk.Label(
-                cont,
-                text=evo["name"],
-                font=EVO_NAME_FONT,
-                fg=GOLD_COLOR if is_cur else TXT,
-                bg=CARD_BG,
-                cursor="arrow" if is_cur else "hand2",
+        url = evo["sprite_url"]
+        if ImageKey("sprite", url, EVO_SPRITE_SIZE) in images:
+            self._show_evo_sprite(spr, url, None)
+        else:
+            self._load_async(
+                fetch_image,
+                (url, EVO_SPRITE_SIZE),
+                lambda img: self._show_evo_sprite(spr, url, img),
+                lambda e: self._show_evo_sprite(spr, url, None),
+                widget=spr,
             )
-            name.pack(pady=(0, 3))
 
-            if not is_cur:
+        name = tk.Label(
+            cont,
+            text=evo["name"],
+            font=EVO_NAME_FONT,
+            fg=GOLD_COLOR if is_cur else TXT,
+            bg=CARD_BG,
+            cursor="arrow" if is_cur else "hand2",
+        )
+        name.pack(pady=(0, 3))
+
+        if not is_cur:
+
+            def enter(e, c=cont, s=spr, n=name):
+                c.configure(highlightbackground=HIGHLIGHT_COLOR)
+                s.configure(highlightbackground=HIGHLIGHT_COLOR, bg=INPUT_BG_COLOR)
+                n.configure(fg=HIGHLIGHT_COLOR, bg=INPUT_BG_COLOR)
 
-                def enter(e, c=cont, s=spr, n=name):
-                    c.configure(highlightbackground=HIGHLIGHT_COLOR)
-                    s.configure(highlightbackground=HIGHLIGHT_COLOR, bg=INPUT_BG_COLOR)
-                    n.configure(fg=HIGHLIGHT_COLOR, bg=INPUT_BG_COLOR)
+            def leave(e, c=cont, s=spr, n=name):
+                c.configure(highlightbackground=CARD_BG)
+                s.configure(highlightbackground=CARD_BG, bg=CARD_BG)
+                n.configure(fg=TXT, bg=CARD_BG)
 
-                def leave(e, c=cont, s=spr, n=name):
-                    c.configure(highlightbackground=CARD_BG)
-                    s.configure(highlightbackground=CARD_BG, bg=CARD_BG)
-                    n.configure(fg=TXT, bg=CARD_BG)
+            def click(e, ev=evo):
+                self._switch(ev)
 
-                def click(e, ev=evo):
-                    self._switch(ev)
+            for w in [cont, spr, name]:
+                w.bind("<Enter>", enter)
+                w.bind("<Leave>", leave)
+                w.bind("<Button-1>", click)
 
-                for w in [cont, spr, name]:
-                    w.bind("<Enter>", enter)
-                    w.bind("<Leave>", leave)
-                    w.bind("<Button-1>", click)
+    def _show_evo_sprite(self, lbl, url, img):
+        key = ImageKey("sprite", url, EVO_SPRITE_SIZE)
+        if img:
+            images.put(key, ImageTk.PhotoImage(img))
+        photo = images.get(key) or self._load_img(ERROR_IMG, EVO_SPRITE_SIZE)
+        if photo:
+            lbl.configure(image=photo)
+            lbl.image = photo
 
     def _switch(self, evo):
-        try:
-            poke = get_pokemon(evo["id"])
-            if not poke:
-                return
-            self._stop_all()
-            self.shiny = False
-            self.cur_poke = poke
+        # The shown Pokémon's loads keep going until the new one arrives
+        if self.switch_task:
+            self.switch_task.cancel()
+        self.switch_task = self._load_async(
+            get_pokemon,
+            (evo["id"],),
+            self._show_switched,
+            lambda e: self._switch_failed(evo, e),
+        )
 
-            self._destroy(self.wgts[3:])
-            self.wgts = self.wgts[:3]
+    def _show_switched(self, poke):
+        self.switch_task = None
+        if not poke:
+            return
+        self._new_view()
+        self._stop_all()
+        self.shiny = False
+        self.cur_poke = poke
 
-            self._left_card(poke)
-            self._right_card(poke)
-        except NetworkError as e:
+        self._destroy(self.wgts[3:])
+        self.wgts = self.wgts[:3]
+
+        self._left_card(poke)
+        self._right_card(poke)
+
+    def on_connectivity(self, online):
+        """Fill in greyed-out cards once the network is back"""
+        if not online or self.ctrl.cur_frame != "PokedexFrame":
+            return
+        if self.offline_page and not self.in_detail:
+            self._show_page()
+
+    def on_data_changed(self, ns, key, value):
+        """Redraw the open detail view if its data was refreshed"""
+        if self.ctrl.cur_frame != "PokedexFrame" or not self.in_detail:
+            return
+        if ns not in ("pokemon", "species") or not self.cur_poke:
+            return
+        if value.get("id") != self.cur_poke["id"]:
+            return
+
+        self._new_view()
+        self._show_switched(value if ns == "pokemon" else self.cur_poke)
+
+    def _switch_failed(self, evo, e):
+        self.switch_task = None
+        if isinstance(e, NetworkError):
             self.wgts.append(self.err.show(str(e), lambda: self._switch(evo)))
-        except PokeAPIError as e:
+        elif isinstance(e, PokeAPIError):
             self.wgts.append(self.err.show(str(e)))
 
     def _close_detail(self):
+        self._new_view()
         self.in_detail = False
         self.shiny = False
         self.cur_poke = None
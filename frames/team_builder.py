@@ -3,14 +3,22 @@ from modules.constants import *
 from modules.pokeapi import (
     get_pokemon,
     get_all_pokemon_names,
-    get_pokemon_weaknesses,
+    get_dex_types,
+    get_known_stat_totals,
     NetworkError,
     PokeAPIError,
 )
+from modules.team_analysis import (
+    analyze_team,
+    get_type_matrix,
+    offensive_coverage,
+)
+from modules.team_optimizer import start_optimise
+from modules.sprites import fetch_image
 from modules.error_handler import ErrorHandler
+from modules.image_cache import ImageKey, images, type_key
+from modules.trace import traced
 from PIL import Image, ImageTk
-import requests
-from io import BytesIO
 import random
 
 # Shortcuts
@@ -37,16 +45,15 @@ class TeamBuilderFrame(tk.Frame):
         self.poke_list_fr = None
         self.all_pokes = []
         self.filt_pokes = []
+        self.opt_job = None
+        self.slot_reqs = {}  # slot -> (id, batch) of the load in flight
 
         # Widgets
         self.wgts = []
+        self.opt_btn = None
         self.ana_popup = None
         self.stat_bars = []
 
-        # Caches
-        self.img_cache = {}
-        self.spr_cache = {}
-
     # ==================== LIFECYCLE ====================
 
     def on_show(self):
@@ -69,6 +76,10 @@ class TeamBuilderFrame(tk.Frame):
         self.dd_cvs = None
         self.dd_idx = None
         self.poke_list_fr = None
+        self.opt_job = None
+        self.opt_btn = None
+        self.slot_reqs = {}
+        self.ctrl.sched.cancel("TeamBuilderFrame")
         self.stat_bars = []
 
     def _clean_menu(self):
@@ -89,35 +100,32 @@ class TeamBuilderFrame(tk.Frame):
             except:
                 pass
 
+    @traced("image")
     def _load_img(self, path, size, resample=Image.LANCZOS):
-        key = f"{path}_{size}_{resample}"
-        if key in self.img_cache:
-            return self.img_cache[key]
         try:
-            img = Image.open(path).resize(size, resample)
-            photo = ImageTk.PhotoImage(img)
-            self.img_cache[key] = photo
-            return photo
+            return images.load(path, size, resample)
         except:
             return None
 
+    @traced("image")
     def _fetch(self, url, size, fallback=False):
         """Fetch image from URL. If fallback=True, return error.png on failure"""
-        key = f"{url}_{size}"
-        if key in self.spr_cache:
-            return self.spr_cache[key]
-        try:
-            r = requests.get(url, timeout=5)
-            r.raise_for_status()
-            img = Image.open(BytesIO(r.content)).resize(size, Image.NEAREST)
-            photo = ImageTk.PhotoImage(img)
-            self.spr_cache[key] = photo
+        key = ImageKey("sprite", url, size)
+        photo = images.get(key)
+        if photo:
             return photo
+        try:
+            return images.put(key, ImageTk.PhotoImage(fetch_image(url, size)))
         except:
             if fallback:
                 return self._load_img(ERROR_IMG, size)
             return None
 
+    def on_connectivity(self, online):
+        # The list loaded while offline only holds cached Pokémon
+        if online:
+            self.all_pokes = []
+
     def _load_poke_list(self):
         if not self.all_pokes:
             try:
@@ -131,18 +139,16 @@ class TeamBuilderFrame(tk.Frame):
         self.filt_pokes = self.all_pokes.copy()
 
     def _type_icon(self, name):
-        key = f"type_{name}"
-        if key in self.img_cache:
-            return self.img_cache[key]
+        key = type_key(name)
+        photo = images.get(key)
+        if photo:
+            return photo
         try:
             tid = TYPE_IDS.get(name.lower())
             if not tid:
                 return None
-            url = f"{TYPE_ICON_URL}/{tid}.png"
-            photo = self._fetch(url, TYPE_ICON_SIZE, fallback=False)
-            if photo:
-                self.img_cache[key] = photo
-            return photo
+            img = fetch_image(f"{TYPE_ICON_URL}/{tid}.png", TYPE_ICON_SIZE)
+            return images.put(key, ImageTk.PhotoImage(img))
         except:
             return None
 
@@ -259,6 +265,20 @@ class TeamBuilderFrame(tk.Frame):
         rand_btn.bind("<Button-1>", lambda e: self._randomise())
         self.wgts.append(rand_btn)
 
+        self.opt_btn = tk.Label(
+            self.ctrl,
+            text="⚙️ Optimise",
+            font=NAV_FONT,
+            fg=HIGHLIGHT_COLOR,
+            bg=ACCENT_COLOR,
+            cursor="hand2",
+            padx=20,
+            pady=10,
+        )
+        self.opt_btn.place(x=TEAM_OPTIMISE_BTN_X, y=TEAM_BTN_Y)
+        self.opt_btn.bind("<Button-1>", lambda e: self._optimise())
+        self.wgts.append(self.opt_btn)
+
         ana_btn = tk.Label(
             self.ctrl,
             text="📊 Analytics",
@@ -368,7 +388,7 @@ class TeamBuilderFrame(tk.Frame):
         row = tk.Frame(self.poke_list_fr, bg=INPUT_BG_COLOR, cursor="hand2")
         row.pack(fill="x", pady=1)
 
-        url = f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{poke['id']}.png"
+        url = f"{SPRITE_URL}/{poke['id']}.png"
         spr = self._fetch(url, TEAM_MINI_SPRITE_SIZE, fallback=True)
 
         spr_lbl = None
@@ -431,6 +451,7 @@ class TeamBuilderFrame(tk.Frame):
     # ==================== TEAM MANAGEMENT ====================
 
     def _select_poke(self, idx, poke_data):
+        self._cancel_slot(idx)
         try:
             poke = get_pokemon(poke_data["id"])
             self.team[idx] = poke
@@ -446,15 +467,17 @@ class TeamBuilderFrame(tk.Frame):
             self.wgts.append(self.err.show(str(e)))
 
     def _remove_poke(self, idx):
+        self._cancel_slot(idx)
         self.team[idx] = None
         self._update_card(idx)
 
-    def _update_card(self, idx):
+    def _update_card(self, idx, spr=None):
         card = self.cards[idx]
         poke = self.team[idx]
 
         if poke:
-            spr = self._fetch(poke["sprite_url"], TEAM_SPRITE_SIZE, fallback=True)
+            if not spr:
+                spr = self._fetch(poke["sprite_url"], TEAM_SPRITE_SIZE, fallback=True)
             if spr:
                 card["sprite"].configure(image=spr)
                 card["sprite"].image = spr
@@ -479,17 +502,173 @@ class TeamBuilderFrame(tk.Frame):
             return
 
         picks = random.sample(self.all_pokes, min(6, len(self.all_pokes)))
+        self._load_team([(i, p["id"]) for i, p in enumerate(picks)])
+
+    def _load_team(self, slots):
+        """Fetch (slot, id) pairs concurrently, filling cards as each arrives"""
+        batch = {"left": len(slots), "failed": [], "err": None}
+        old = [self._drop_slot(i) for i, _ in slots]
+
+        for i, pid in slots:
+            self.cards[i]["name"].configure(text="Loading...", fg=MUTED_COLOR)
+            self.slot_reqs[i] = (pid, batch)
+            self.ctrl.sched.submit(
+                self._fetch_member,
+                pid,
+                on_done=lambda res, i=i, pid=pid: self._member_done(batch, i, pid, res),
+                on_error=lambda e, i=i, pid=pid: self._member_failed(batch, i, pid, e),
+                owner=("TeamBuilderFrame", "team", i),
+                priority=PRIO_INTERACTIVE,
+            )
 
-        for i, poke_data in enumerate(picks):
-            try:
-                poke = get_pokemon(poke_data["id"])
-                self.team[i] = poke
-                self._update_card(i)
-            except NetworkError as e:
-                self.wgts.append(self.err.show(str(e)))
-                return
-            except PokeAPIError:
-                pass
+        # Settled only now, so they don't report the slots being reloaded
+        for req in old:
+            if req:
+                self._batch_step(req[1])
+
+    def _drop_slot(self, idx):
+        """Cancel the slot's pending load, returns its (id, batch) or None"""
+        self.ctrl.sched.cancel(("TeamBuilderFrame", "team", idx))
+        return self.slot_reqs.pop(idx, None)
+
+    def _cancel_slot(self, idx):
+        req = self._drop_slot(idx)
+        if req:
+            self._batch_step(req[1])
+
+    def _take_slot(self, batch, idx, pid):
+        """True if this result is still the one the slot is waiting for"""
+        req = self.slot_reqs.get(idx)
+        if not req or req[0] != pid or req[1] is not batch:
+            return False
+        del self.slot_reqs[idx]
+        return True
+
+    def _fetch_member(self, pid):
+        """Worker thread: Pokémon data plus its decoded card sprite"""
+        poke = get_pokemon(pid)
+        if ImageKey("sprite", poke["sprite_url"], TEAM_SPRITE_SIZE) in images:
+            return poke, None
+        try:
+            return poke, fetch_image(poke["sprite_url"], TEAM_SPRITE_SIZE)
+        except Exception:
+            return poke, None
+
+    def _member_done(self, batch, idx, pid, res):
+        if not self._take_slot(batch, idx, pid):
+            return
+        poke, img = res
+        key = ImageKey("sprite", poke["sprite_url"], TEAM_SPRITE_SIZE)
+        if img:
+            images.put(key, ImageTk.PhotoImage(img))
+        spr = images.get(key) or self._load_img(ERROR_IMG, TEAM_SPRITE_SIZE)
+
+        self.team[idx] = poke
+        self._update_card(idx, spr)
+        self._batch_step(batch)
+
+    def _member_failed(self, batch, idx, pid, e):
+        if not self._take_slot(batch, idx, pid):
+            return
+        self.team[idx] = None
+        self._update_card(idx)
+        self.cards[idx]["name"].configure(text="Failed to load", fg=ACCENT_COLOR)
+
+        batch["failed"].append((idx, pid))
+        if batch["err"] is None or isinstance(e, NetworkError):
+            batch["err"] = e
+        self._batch_step(batch)
+
+    def _batch_step(self, batch):
+        """Report all failed slots together once the whole batch has settled"""
+        batch["left"] -= 1
+        # Slots picked or reloaded since are no longer this batch's failures
+        failed = [
+            (i, pid)
+            for i, pid in batch["failed"]
+            if not self.team[i] and i not in self.slot_reqs
+        ]
+        if batch["left"] or not failed:
+            return
+
+        e = batch["err"]
+        if isinstance(e, NetworkError):
+            self.wgts.append(self.err.show(str(e), lambda: self._load_team(failed)))
+        elif isinstance(e, PokeAPIError):
+            self.wgts.append(self.err.show(str(e)))
+        else:
+            self.wgts.append(self.err.show(ERR_LOAD_FAILED))
+
+    def _optimise(self):
+        """Fill empty slots with a type-balanced completion of the team"""
+        self._close_dd()
+
+        free = [i for i, p in enumerate(self.team) if not p]
+        if not free or self.opt_job:
+            return
+
+        # The dex and type matrix take 18 fetches the first time
+        task = self.opt_job = self.ctrl.sched.submit(
+            self._optimise_inputs,
+            on_done=lambda res: self._start_optimise(task, free, res),
+            on_error=lambda e: self._optimise_failed(task, e),
+            owner=("TeamBuilderFrame", "optimise"),
+            priority=PRIO_INTERACTIVE,
+        )
+        self.opt_btn.configure(text="⏳ Optimising")
+
+    def _optimise_inputs(self):
+        """Worker thread: dex types, type matrix and known stat totals"""
+        return get_dex_types(), get_type_matrix(), get_known_stat_totals()
+
+    def _start_optimise(self, task, free, res):
+        # Team was reset or left while the inputs were loading
+        if task is not self.opt_job:
+            return
+
+        dex, matrix, totals = res
+        locked = [p for p in self.team if p]
+        try:
+            self.opt_job = start_optimise(
+                locked, len(free), dex, matrix, totals, TEAM_OPTIMISE_BUDGET
+            )
+        except Exception:
+            self._optimise_failed(task, None)
+            return
+        self._poll_optimise(self.opt_job, free)
+
+    def _optimise_failed(self, task, e):
+        if task is not self.opt_job:
+            return
+
+        self.opt_job = None
+        self.opt_btn.configure(text="⚙️ Optimise")
+        if isinstance(e, NetworkError):
+            self.wgts.append(self.err.show(str(e), self._optimise))
+        elif isinstance(e, PokeAPIError):
+            self.wgts.append(self.err.show(str(e)))
+        else:
+            self.wgts.append(self.err.show(ERR_LOAD_FAILED, self._optimise))
+
+    def _poll_optimise(self, job, free):
+        # Team was reset or left while the worker was searching
+        if job is not self.opt_job:
+            return
+
+        if not job.done():
+            self.after(TEAM_OPTIMISE_POLL_MS, lambda: self._poll_optimise(job, free))
+            return
+
+        self.opt_job = None
+        self.opt_btn.configure(text="⚙️ Optimise")
+
+        try:
+            picks = job.result()
+        except Exception:
+            self.wgts.append(self.err.show(ERR_LOAD_FAILED, self._optimise))
+            return
+
+        self._load_team(list(zip(free, picks)))
 
     # ==================== ANALYTICS ====================
 
@@ -503,6 +682,15 @@ class TeamBuilderFrame(tk.Frame):
 
         self._close_ana()
 
+        try:
+            ana = analyze_team(team_pokes)
+        except NetworkError as e:
+            self.wgts.append(self.err.show(str(e), self._show_ana))
+            return
+        except PokeAPIError as e:
+            self.wgts.append(self.err.show(str(e)))
+            return
+
         popup = tk.Frame(
             self.ctrl,
             bg=CARD_BG,
@@ -549,9 +737,10 @@ class TeamBuilderFrame(tk.Frame):
         right = tk.Frame(cont, bg=CARD_BG)
         right.pack(side=tk.RIGHT, fill="both", expand=True, padx=(10, 0))
 
-        self._build_weak(left, team_pokes)
-        self._build_resist(left, team_pokes)
-        self._build_stats(right, team_pokes)
+        self._build_weak(left, ana)
+        self._build_resist(left, ana)
+        self._build_stats(right, ana)
+        self._build_cover(right, team_pokes)
 
     def _build_sec_fr(self, parent, title, emoji, color):
         fr = tk.Frame(
@@ -578,16 +767,10 @@ class TeamBuilderFrame(tk.Frame):
 
         return cont
 
-    def _build_weak(self, parent, team):
+    def _build_weak(self, parent, ana):
         cont = self._build_sec_fr(parent, "Weaknesses", "⚠️", ACCENT_COLOR)
 
-        weak_cnt = {}
-        for poke in team:
-            weaks = get_pokemon_weaknesses(poke.get("types", []))
-            for w in weaks:
-                weak_cnt[w] = weak_cnt.get(w, 0) + 1
-
-        sorted_weak = sorted(weak_cnt.items(), key=lambda x: -x[1])
+        sorted_weak = sorted(ana["weak"].items(), key=lambda x: -x[1])
 
         if sorted_weak:
             icons_fr = tk.Frame(cont, bg=ANALYTICS_SECTION_BG)
@@ -625,24 +808,13 @@ class TeamBuilderFrame(tk.Frame):
                 bg=ANALYTICS_SECTION_BG,
             ).pack(anchor="w")
 
-    def _build_resist(self, parent, team):
+    def _build_resist(self, parent, ana):
         cont = self._build_sec_fr(parent, "Resistances", "🛡️", RESIST_COLOR)
 
-        resist_cnt = {}
-        for poke in team:
-            types = poke.get("types", [])
-            for t in types:
-                try:
-                    r = requests.get(f"{TYPE_ENDPOINT}/{t.lower()}", timeout=3)
-                    data = r.json()
-                    for res in data["damage_relations"]["half_damage_from"]:
-                        n = res["name"].capitalize()
-                        resist_cnt[n] = resist_cnt.get(n, 0) + 1
-                    for imm in data["damage_relations"]["no_damage_from"]:
-                        n = imm["name"].capitalize()
-                        resist_cnt[n] = resist_cnt.get(n, 0) + 2
-                except:
-                    pass
+        # Immunities weigh double
+        resist_cnt = dict(ana["resist"])
+        for t, n in ana["immune"].items():
+            resist_cnt[t] = resist_cnt.get(t, 0) + 2 * n
 
         sorted_resist = sorted(resist_cnt.items(), key=lambda x: -x[1])
 
@@ -682,25 +854,10 @@ class TeamBuilderFrame(tk.Frame):
                 bg=ANALYTICS_SECTION_BG,
             ).pack(anchor="w")
 
-    def _build_stats(self, parent, team):
+    def _build_stats(self, parent, ana):
         cont = self._build_sec_fr(parent, "Team Stats", "📈", GOLD_COLOR)
 
-        stats = {
-            "hp": 0,
-            "attack": 0,
-            "defense": 0,
-            "sp_attack": 0,
-            "sp_defense": 0,
-            "speed": 0,
-        }
-        for poke in team:
-            poke_stats = poke.get("stats", {})
-            for s in stats:
-                stats[s] += poke_stats.get(s, 0)
-
-        cnt = len(team)
-        for s in stats:
-            stats[s] = int(stats[s] / cnt)
+        stats = ana["stats"]
 
         stat_labels = {
             "hp": "HP",
@@ -755,6 +912,55 @@ class TeamBuilderFrame(tk.Frame):
 
         self._anim_bars()
 
+    def _build_cover(self, parent, team):
+        cont = self._build_sec_fr(parent, "Coverage Gaps", "🎯", COVER_COLOR)
+
+        status = tk.Label(
+            cont,
+            text="Calculating...",
+            font=BODY_FONT,
+            fg=MUTED_COLOR,
+            bg=ANALYTICS_SECTION_BG,
+        )
+        status.pack(anchor="w")
+
+        self.ctrl.sched.submit(
+            offensive_coverage,
+            [p["id"] for p in team],
+            on_done=lambda cov: self._fill_cover(cont, status, cov),
+            on_error=lambda e: self._fill_cover(cont, status, None),
+            owner=("TeamBuilderFrame", "analytics"),
+            widget=cont,
+        )
+
+    def _fill_cover(self, cont, status, cov):
+        if cov is None:
+            status.configure(text="Coverage unavailable")
+            return
+
+        gaps = cov["gaps"]
+        dual_gaps = cov["dual_gaps"]
+
+        if not gaps and not dual_gaps:
+            status.configure(text="Full coverage! ✓", fg=RESIST_COLOR)
+            return
+
+        status.configure(
+            text=f"Dual types unhit: {len(dual_gaps)}/{len(cov['duals'])}",
+            font=TEAM_STAT_FONT,
+        )
+
+        if gaps:
+            icons_fr = tk.Frame(cont, bg=ANALYTICS_SECTION_BG)
+            icons_fr.pack(anchor="w", pady=(5, 0))
+
+            for i, type_name in enumerate(gaps[:COVER_MAX_GAPS]):
+                icon = self._type_icon(type_name)
+                if icon:
+                    lbl = tk.Label(icons_fr, image=icon, bg=ANALYTICS_SECTION_BG)
+                    lbl.image = icon
+                    lbl.grid(row=i // 4, column=i % 4, padx=3, pady=3)
+
     def _anim_bars(self):
         if not self.stat_bars:
             return
@@ -814,6 +1020,7 @@ class TeamBuilderFrame(tk.Frame):
         ok_btn.bind("<Button-1>", lambda e: self._close_ana())
 
     def _close_ana(self):
+        self.ctrl.sched.cancel(("TeamBuilderFrame", "analytics"))
         self.stat_bars = []
 
         if self.ana_popup:
@@ -4,7 +4,11 @@ Project Rotom - Main Application Class
 
 import tkinter as tk
 from modules.constants import *
+from modules import metrics, net, watchdog
 from modules.gif_player import GIFPlayer
+from modules.perf_overlay import PerfOverlay
+from modules.pokeapi import add_listener
+from modules.scheduler import Scheduler
 
 
 class App(tk.Tk):
@@ -21,6 +25,11 @@ class App(tk.Tk):
         self.cur_frame = None
         self.gif = None
         self.frames = {}
+        self.sched = Scheduler(self)
+        self.watchdog = watchdog.start(self) if WATCHDOG_ENABLED else None
+        metrics.start_exporters()
+        self.perf = PerfOverlay(self)
+        self.bind(PERF_TOGGLE_KEY, self.perf.toggle)
 
         self.bg_lbl = tk.Label(self, bg=BG_COLOR)
         self.bg_lbl.pack(fill="both", expand=True)
@@ -33,6 +42,10 @@ class App(tk.Tk):
         self._init_frames()
         self.show("WelcomeFrame")
 
+        # Background refreshes of cached API data reach frames on the Tk thread
+        add_listener(lambda *a: self.sched.post(self._data_changed, *a))
+        net.on_connectivity(lambda on: self.sched.post(self._connectivity, on))
+
     def _init_frames(self):
         """Initialize all frames"""
         from frames.welcome import WelcomeFrame
@@ -57,6 +70,10 @@ class App(tk.Tk):
         if self.gif:
             self.gif.stop()
 
+        # Work started by the frame being left can no longer be shown
+        if self.cur_frame:
+            self.sched.cancel(self.cur_frame)
+
         frame = self.frames[name]
         frame.tkraise()
         self.container.lift()
@@ -65,6 +82,16 @@ class App(tk.Tk):
         if hasattr(frame, "on_show"):
             frame.on_show()
 
+    def _data_changed(self, ns, key, value):
+        for f in self.frames.values():
+            if hasattr(f, "on_data_changed"):
+                f.on_data_changed(ns, key, value)
+
+    def _connectivity(self, online):
+        for f in self.frames.values():
+            if hasattr(f, "on_connectivity"):
+                f.on_connectivity(online)
+
     def set_bg(self, path):
         """Set background GIF"""
         GIFPlayer.stop_all()
@@ -0,0 +1,183 @@
+"""
+Project Rotom - Sprite Atlas
+
+Every default front sprite packed into a few sheets, in each size listed in
+ATLAS_VARIANTS, plus an index of where each one sits. At runtime a sheet is
+decoded once and sprites are cropped from it instead of fetched one by one.
+
+    python -m modules.atlas            # build into ATLAS_DIR
+    python -m modules.atlas --limit 151
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from modules.constants import *
+from modules import metrics
+from modules.trace import span
+
+_cache = metrics.counter(
+    "rotom_cache_requests_total", "Cache lookups by result", ("cache", "result")
+)
+
+_lock = threading.Lock()
+_index = None
+_sheets = {}
+
+
+def _pid(url):
+    """Pokémon id of a default front sprite URL, else None"""
+    prefix = f"{SPRITE_URL}/"
+    if not url.startswith(prefix) or not url.endswith(".png"):
+        return None
+    name = url[len(prefix) : -len(".png")]
+    return int(name) if name.isdigit() else None
+
+
+def _load_index():
+    global _index
+    if _index is None:
+        try:
+            with open(ATLAS_INDEX) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        # An atlas built from another sprite source doesn't match our URLs
+        _index = index if index.get("source") == SPRITE_URL else {}
+    return _index
+
+
+def _sheet(name):
+    img = _sheets.get(name)
+    if img is None:
+        with span("decode", "image", url=name):
+            img = Image.open(os.path.join(ATLAS_DIR, name))
+            img.load()
+        _sheets[name] = img
+    return img
+
+
+def crop(url, size, resample=Image.NEAREST):
+    """Sprite for `url` at `size` cut from the atlas, or None if it isn't there.
+
+    Safe off the Tk thread. The first crop from a sheet decodes it.
+    """
+    pid = _pid(url)
+    if pid is None:
+        return None
+
+    with _lock:
+        variants = _load_index().get("variants", {})
+        # A sheet at the exact size needs no resize, else scale the largest
+        exact = [v for v in variants.values() if tuple(v["size"]) == tuple(size)]
+        variant = exact[0] if exact else variants.get("front")
+        cell = variant["cells"].get(str(pid)) if variant else None
+        if cell is None:
+            _cache.inc("atlas", "miss")
+            return None
+        try:
+            sheet = _sheet(variant["sheets"][cell[0]])
+        except OSError:
+            _cache.inc("atlas", "miss")
+            return None
+
+    w, h = variant["size"]
+    x, y = cell[1], cell[2]
+    img = sheet.crop((x, y, x + w, y + h))
+    if (w, h) != tuple(size):
+        img = img.resize(size, resample)
+    _cache.inc("atlas", "hit")
+    return img
+
+
+# ==================== BUILD ====================
+
+
+def _download(pid):
+    from modules.sprites import fetch_bytes
+
+    try:
+        img = Image.open(BytesIO(fetch_bytes(f"{SPRITE_URL}/{pid}.png")))
+        return img.convert("RGBA")
+    except Exception:
+        return None
+
+
+def _pack(name, size, sprites, out):
+    """Lays sprites out in sheets, returns the variant's index entry"""
+    w, h = size
+    cols, rows = ATLAS_SHEET_PX // w, ATLAS_SHEET_PX // h
+    per_sheet = cols * rows
+    pids = sorted(sprites)
+    sheets, cells = [], {}
+
+    for n, start in enumerate(range(0, len(pids), per_sheet)):
+        chunk = pids[start : start + per_sheet]
+        used_rows = -(-len(chunk) // cols)
+        sheet = Image.new("RGBA", (min(len(chunk), cols) * w, used_rows * h))
+
+        for i, pid in enumerate(chunk):
+            x, y = i % cols * w, i // cols * h
+            img = sprites[pid]
+            if img.size != size:
+                img = img.resize(size, Image.NEAREST)
+            sheet.paste(img, (x, y))
+            cells[str(pid)] = [n, x, y]
+
+        fname = f"{name}_{n}.png"
+        sheet.save(os.path.join(out, fname), optimize=True)
+        sheets.append(fname)
+
+    return {"size": list(size), "sheets": sheets, "cells": cells}
+
+
+def build(out=ATLAS_DIR, limit=TOTAL_POKEMON, workers=8):
+    """Download every sprite and write the sheets and index, returns the index"""
+    with ThreadPoolExecutor(workers) as pool:
+        imgs = pool.map(_download, range(1, limit + 1))
+        sprites = {pid: img for pid, img in enumerate(imgs, 1) if img}
+
+    os.makedirs(out, exist_ok=True)
+    index = {
+        "source": SPRITE_URL,
+        "built": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "variants": {
+            name: _pack(name, size, sprites, out)
+            for name, size in ATLAS_VARIANTS.items()
+        },
+    }
+
+    # Index last, so a half-built atlas is never picked up
+    tmp = os.path.join(out, f"index.json.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, os.path.join(out, "index.json"))
+    return index
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the sprite atlas")
+    ap.add_argument("--out", default=ATLAS_DIR)
+    ap.add_argument("--limit", type=int, default=TOTAL_POKEMON, help="highest id")
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args()
+
+    start = time.perf_counter()
+    index = build(args.out, args.limit, args.workers)
+    for name, v in index["variants"].items():
+        print(f"{name:6} {len(v['cells']):5d} sprites in {len(v['sheets'])} sheet(s)")
+    missing = args.limit - len(index["variants"]["front"]["cells"])
+    if missing:
+        print(f"{missing} sprite(s) could not be fetched and will load over HTTP")
+    print(f"Built {args.out} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import hashlib
 import os
 
 # ==================== WINDOW DIMENSIONS ====================
@@ -64,13 +65,28 @@ START_BTN_WIDTH = 200
 START_BTN_HEIGHT = 80
 
 # ==================== API CONFIGURATION ====================
-POKEAPI_BASE_URL = "https://pokeapi.co/api/v2"
+# Both can be pointed at a local stand-in (python -m benchmarks.standin)
+DEFAULT_API_URL = "https://pokeapi.co/api/v2"
+DEFAULT_SPRITE_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites"
+POKEAPI_BASE_URL = os.environ.get("ROTOM_API_URL", DEFAULT_API_URL)
+SPRITE_BASE_URL = os.environ.get("ROTOM_SPRITE_URL", DEFAULT_SPRITE_URL)
 POKEMON_ENDPOINT = f"{POKEAPI_BASE_URL}/pokemon"
 TYPE_ENDPOINT = f"{POKEAPI_BASE_URL}/type"
 
-ANIMATED_SPRITE_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/versions/generation-v/black-white/animated"
+SPRITE_URL = f"{SPRITE_BASE_URL}/pokemon"
+ANIMATED_SPRITE_URL = f"{SPRITE_URL}/versions/generation-v/black-white/animated"
 SHINY_ANIMATED_SPRITE_URL = f"{ANIMATED_SPRITE_URL}/shiny"
 
+# ==================== PERSISTENT CACHE ====================
+# Data from other API or sprite hosts (a local stand-in) is kept in its own
+# subdirectory so it never mixes with what the real hosts served
+_CACHE_ROOT = os.path.join(BASE_DIR, ".cache")
+if (POKEAPI_BASE_URL, SPRITE_BASE_URL) != (DEFAULT_API_URL, DEFAULT_SPRITE_URL):
+    _source = f"{POKEAPI_BASE_URL}|{SPRITE_BASE_URL}".encode()
+    _CACHE_ROOT = os.path.join(_CACHE_ROOT, hashlib.sha1(_source).hexdigest()[:12])
+CACHE_DIR = os.environ.get("ROTOM_CACHE_DIR", _CACHE_ROOT)
+CACHE_DB = os.path.join(CACHE_DIR, "rotom.db")
+
 # ==================== HOW TO USE ====================
 TUT_MENU_BG = os.path.join(ASSETS_PATH, "tut_menu.png")
 
@@ -158,6 +174,10 @@ EVO_SPRITE_SIZE = (60, 60)
 TYPE_ICON_SIZE = (85, 28)
 BACK_BTN_SIZE = (120, 35)
 
+# ==================== IMAGE CACHE ====================
+# Pixel bytes of Tk images kept for reuse; images on screen are never evicted
+IMAGE_CACHE_BYTES = 96 * 2**20
+
 # ==================== QUIT BUTTON ====================
 QUIT_BTN_X = 150
 QUIT_BTN_Y = 140
@@ -252,8 +272,10 @@ TYPE_IDS = {
     "fairy": 18,
 }
 
-TYPE_ICON_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/types/generation-viii/sword-shield"
+TYPE_ICON_URL = f"{SPRITE_BASE_URL}/types/generation-viii/sword-shield"
 SPECIES_ENDPOINT = f"{POKEAPI_BASE_URL}/pokemon-species"
+MOVE_DAMAGE_CLASS_ENDPOINT = f"{POKEAPI_BASE_URL}/move-damage-class"
+EVOLUTION_CHAIN_ENDPOINT = f"{POKEAPI_BASE_URL}/evolution-chain"
 
 # ==================== APP MENU ====================
 MENU_ICON_SIZE = (165, 165)
@@ -291,8 +313,13 @@ TEAM_DROPDOWN_HEIGHT = 162
 TEAM_DD_LIMIT = 50
 
 TEAM_BTN_Y = 510
-TEAM_RANDOM_BTN_X = 360
-TEAM_ANALYTICS_BTN_X = 560
+TEAM_RANDOM_BTN_X = 300
+TEAM_OPTIMISE_BTN_X = 470
+TEAM_ANALYTICS_BTN_X = 640
+
+# ==================== TEAM OPTIMISER ====================
+TEAM_OPTIMISE_BUDGET = 2.0  # seconds of search per run
+TEAM_OPTIMISE_POLL_MS = 100
 
 TEAM_X_BTN_OFFSET = 25
 TEAM_X_BTN_Y = 5
@@ -318,6 +345,8 @@ STAT_COLORS = {
 }
 
 RESIST_COLOR = "#4CAF50"
+COVER_COLOR = "#9DB7F5"
+COVER_MAX_GAPS = 8
 
 EMPTY_WARN_WIDTH = 350
 EMPTY_WARN_HEIGHT = 120
@@ -334,3 +363,82 @@ ERROR_POPUP_Y = 245
 
 ERR_NO_INTERNET = "Please connect to the internet\nto load Pokémon data"
 ERR_LOAD_FAILED = "Failed to load data\nPlease try again"
+
+# ==================== BACKGROUND LOADING ====================
+SCHED_WORKERS = 8
+SCHED_POLL_MS = 15
+SCHED_IDLE_MS = 250  # poll for callbacks posted from other threads
+SCHED_STATS_WINDOW = 200
+
+# Task priorities, lowest runs first
+PRIO_INTERACTIVE = 0
+PRIO_VISIBLE = 1
+PRIO_PREFETCH = 2
+PRIO_BACKGROUND = 3
+
+# Cached API data older than this is served, then refreshed in the background
+API_SOFT_TTL = 7 * 24 * 3600
+API_REFRESH_WORKERS = 2
+
+# Evolution chain stages fetched at once
+EVO_FETCH_WORKERS = 4
+
+# Concurrent requests allowed per priority lane, indexed by priority
+NET_LANE_LIMITS = (6, 6, 2, 1)
+
+# Offline mode: after consecutive connection failures to the API host only
+# cached data is served while the API is probed in the background
+NET_PROBE_URL = POKEAPI_BASE_URL
+NET_PROBE_INTERVAL = 5
+NET_OFFLINE_FAILURES = 2
+SPRITE_CACHE_DIR = os.path.join(CACHE_DIR, "sprites")
+OFFLINE_CARD_BG = "#161616"  # dimmer than CARD_BG_COLOR
+
+# Per-host circuit breaker: opens after this many failures in a row and
+# lets one probe through after the cooldown, doubling it on each failed probe
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 10
+BREAKER_MAX_COOLDOWN = 120
+ERROR_RETRY_POLL_MS = 1000
+
+# HTTP client: "requests" (one connection per request) or "http2" (httpx,
+# multiplexed; needs the http2 extra and falls back to requests without it)
+NET_TRANSPORT = os.environ.get("ROTOM_TRANSPORT", "requests")
+
+# ==================== SPRITE ATLAS ====================
+# Default front sprites packed into a few sheets by `python -m modules.atlas`.
+# Sprites missing from the atlas (or no atlas at all) are fetched over HTTP.
+ATLAS_DIR = os.environ.get("ROTOM_ATLAS_DIR", os.path.join(ASSETS_PATH, "atlas"))
+ATLAS_INDEX = os.path.join(ATLAS_DIR, "index.json")
+ATLAS_SHEET_PX = 2048
+# Variant name -> cell size; sprites are pre-resized so crops need no resize
+ATLAS_VARIANTS = {"front": (96, 96), "mini": TEAM_MINI_SPRITE_SIZE}
+
+# ==================== DIAGNOSTICS ====================
+# Chrome trace output path; tracing is off (and free) when unset
+TRACE_PATH = os.environ.get("ROTOM_TRACE")
+
+# Metrics: JSONL snapshots and/or a localhost Prometheus endpoint when set
+METRICS_LOG = os.environ.get("ROTOM_METRICS_LOG")
+METRICS_PORT = int(os.environ.get("ROTOM_METRICS_PORT", "0"))
+METRICS_FLUSH_S = 10
+METRICS_LOG_BYTES = 5_000_000
+METRICS_LOG_KEEP = 3
+METRICS_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Main loop watchdog: heartbeat, stack sampling and stall log
+WATCHDOG_ENABLED = os.environ.get("ROTOM_WATCHDOG", "1") != "0"
+WATCHDOG_BEAT_MS = 100
+WATCHDOG_SAMPLE_MS = 25
+WATCHDOG_STALL_MS = 200
+WATCHDOG_HISTORY = 50
+WATCHDOG_LOG = os.path.join(CACHE_DIR, "stalls.log")
+WATCHDOG_LOG_BYTES = 1_000_000
+
+# Performance overlay
+PERF_TOGGLE_KEY = "<F3>"
+PERF_REFRESH_MS = 250
+PERF_FONT = (FONT_NAME, -12)
+PERF_BG_COLOR = "#111111"
+PERF_X = 10
+PERF_Y = 10
@@ -1,19 +1,23 @@
 import tkinter as tk
-from PIL import Image, ImageTk
+from PIL import Image
 from modules.constants import *
+from modules import net
+from modules.image_cache import images
 
 
 class ErrorHandler:
     """Handles error popups across the app"""
 
-    _img_cache = {}
-
     def __init__(self, ctrl):
         self.ctrl = ctrl
         self.popup = None
 
-    def show(self, msg, retry_cb=None):
-        """Show error popup with optional retry"""
+    def show(self, msg, retry_cb=None, url=POKEAPI_BASE_URL):
+        """Show error popup with optional retry.
+
+        `url` is the failed request; its host's breaker decides when Retry
+        is offered.
+        """
         self.close()
 
         self.popup = tk.Frame(
@@ -58,20 +62,6 @@ class ErrorHandler:
         btn_fr = tk.Frame(self.popup, bg=CARD_BG_COLOR)
         btn_fr.place(relx=0.5, rely=0.85, anchor="center")
 
-        if retry_cb:
-            retry = tk.Label(
-                btn_fr,
-                text="Retry",
-                font=(FONT_NAME, -14),
-                fg=HIGHLIGHT_COLOR,
-                bg=ACCENT_COLOR,
-                cursor="hand2",
-                padx=20,
-                pady=6,
-            )
-            retry.pack(side=tk.LEFT, padx=(0, 10))
-            retry.bind("<Button-1>", lambda e: self._retry(retry_cb))
-
         close = tk.Label(
             btn_fr,
             text="Close",
@@ -85,8 +75,35 @@ class ErrorHandler:
         close.pack(side=tk.LEFT)
         close.bind("<Button-1>", lambda e: self.close())
 
+        if retry_cb:
+            self._offer_retry(self.popup, btn_fr, close, retry_cb, url)
+
         return self.popup
 
+    def _offer_retry(self, popup, btn_fr, close, cb, url):
+        """Show Retry once the network layer says a retry could succeed"""
+        if not popup.winfo_exists():
+            return
+        if net.retry_wait(url) != 0:
+            popup.after(
+                ERROR_RETRY_POLL_MS,
+                lambda: self._offer_retry(popup, btn_fr, close, cb, url),
+            )
+            return
+
+        retry = tk.Label(
+            btn_fr,
+            text="Retry",
+            font=(FONT_NAME, -14),
+            fg=HIGHLIGHT_COLOR,
+            bg=ACCENT_COLOR,
+            cursor="hand2",
+            padx=20,
+            pady=6,
+        )
+        retry.pack(side=tk.LEFT, padx=(0, 10), before=close)
+        retry.bind("<Button-1>", lambda e: self._retry(cb))
+
     def _retry(self, cb):
         """Handle retry button click"""
         self.close()
@@ -103,13 +120,7 @@ class ErrorHandler:
 
     def _load_img(self, path, size):
         """Load and cache image"""
-        key = f"{path}_{size}"
-        if key in ErrorHandler._img_cache:
-            return ErrorHandler._img_cache[key]
         try:
-            img = Image.open(path).resize(size, Image.LANCZOS)
-            photo = ImageTk.PhotoImage(img)
-            ErrorHandler._img_cache[key] = photo
-            return photo
+            return images.load(path, size, Image.LANCZOS)
         except:
             return None
@@ -1,4 +1,12 @@
+import time
+
 from PIL import Image, ImageTk, ImageSequence
+from modules import metrics
+from modules.trace import traced
+
+_frames = metrics.counter(
+    "rotom_gif_frames_total", "GIF frames shown or skipped by a late loop", ("result",)
+)
 
 
 class GIFPlayer:
@@ -15,6 +23,8 @@ class GIFPlayer:
         self.current_frame = 0
         self.job = None
         self.durations = []
+        self.delay = 0
+        self.due = None
 
         # Load GIF without processing all frames yet
         self.gif = Image.open(gif_path)
@@ -31,6 +41,7 @@ class GIFPlayer:
 
         GIFPlayer._all_gifs.append(self)
 
+    @traced("gif")
     def _get_frame(self, frame_idx):
         """Get a specific frame and resize it"""
         self.gif.seek(frame_idx)
@@ -53,6 +64,7 @@ class GIFPlayer:
                 photo = self._get_frame(self.current_frame)
                 self.label.config(image=photo)
                 self.label.image = photo
+                self._count_frame()
 
                 # Get duration for this frame
                 duration = (
@@ -64,14 +76,30 @@ class GIFPlayer:
 
                 self.current_frame = (self.current_frame + 1) % self.total_frames
                 self.job = self.label.after(duration, self.animate)
+                self.delay = duration / 1000
+                self.due = time.perf_counter() + self.delay
             except Exception as e:
                 pass
 
+    def _count_frame(self):
+        # Frames whose time passed while the loop was busy count as dropped
+        if self.due is not None:
+            late = time.perf_counter() - self.due
+            if late > self.delay:
+                _frames.inc("dropped", n=int(late / self.delay))
+        _frames.inc("shown")
+
     def stop(self):
         """stop the animation"""
         if self.job:
             self.label.after_cancel(self.job)
             self.job = None
+        self.due = None
+
+    @staticmethod
+    def frames_shown():
+        """Frames shown by every player so far"""
+        return _frames.get("shown")
 
     @classmethod
     def stop_all(cls):
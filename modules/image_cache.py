@@ -0,0 +1,141 @@
+"""
+Project Rotom - Image Cache
+"""
+
+from collections import OrderedDict, namedtuple
+
+import tkinter as tk
+from PIL import Image, ImageTk
+
+from modules.constants import *
+from modules import metrics
+
+# kind groups the stats: asset, sprite, anim, type or blank
+ImageKey = namedtuple("ImageKey", "kind src size variant", defaults=(None,))
+
+# Tk photos keep a 32-bit RGBA block per pixel
+PHOTO_BYTES_PER_PIXEL = 4
+
+_requests = metrics.counter(
+    "rotom_cache_requests_total", "Cache lookups by result", ("cache", "result")
+)
+_evictions = metrics.counter(
+    "rotom_cache_evictions_total", "Cache entries evicted", ("cache",)
+)
+
+
+def type_key(name):
+    """The one key a type icon is cached under, whichever frame loads it"""
+    return ImageKey("type", name.lower(), TYPE_ICON_SIZE)
+
+
+def photos(value):
+    """Every PhotoImage in a cached value, however deeply nested"""
+    if isinstance(value, (tk.PhotoImage, ImageTk.PhotoImage)):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from photos(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from photos(v)
+
+
+def photo_bytes(photo):
+    return photo.width() * photo.height() * PHOTO_BYTES_PER_PIXEL
+
+
+def _inuse(photo):
+    # ImageTk.PhotoImage wraps the Tk photo it creates
+    img = getattr(photo, "_PhotoImage__photo", photo)
+    try:
+        return img.tk.getboolean(img.tk.call("image", "inuse", img.name))
+    except tk.TclError:
+        return False
+
+
+class ImageCache:
+    """Process-wide LRU of Tk images bounded by pixel bytes.
+
+    Tk thread only, apart from `in`. Entries a widget is showing are moved to
+    the recent end instead of evicted, so the cache may run over budget while
+    they stay on screen.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = OrderedDict()  # key -> (value, bytes)
+        self.bytes = 0
+        self.kinds = set()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        self.kinds.add(key.kind)
+        entry = self.entries.get(key)
+        if entry is None:
+            _requests.inc(f"image_{key.kind}", "miss")
+            return None
+        self.entries.move_to_end(key)
+        _requests.inc(f"image_{key.kind}", "hit")
+        return entry[0]
+
+    def put(self, key, value):
+        """Cache a PhotoImage (or a structure of them), returns it"""
+        self.kinds.add(key.kind)
+        old = self.entries.pop(key, None)
+        if old:
+            self.bytes -= old[1]
+        size = sum(photo_bytes(p) for p in photos(value))
+        self.entries[key] = (value, size)
+        self.bytes += size
+        self._evict()
+        return value
+
+    def load(self, path, size=None, resample=Image.LANCZOS):
+        """Local image file as a cached PhotoImage. Raises if it can't be read"""
+        key = ImageKey("asset", path, size, resample)
+        photo = self.get(key)
+        if photo is None:
+            img = Image.open(path)
+            if size:
+                img = img.resize(size, resample)
+            photo = self.put(key, ImageTk.PhotoImage(img))
+        return photo
+
+    def _evict(self):
+        # The newest entry is about to be shown, so it is never a candidate
+        newest = next(reversed(self.entries), None)
+        while self.bytes > self.budget:
+            key = next(iter(self.entries))
+            if key == newest:
+                return
+            value, size = self.entries[key]
+            if any(_inuse(p) for p in photos(value)):
+                # On screen, so as good as just used
+                self.entries.move_to_end(key)
+                continue
+            del self.entries[key]
+            self.bytes -= size
+            _evictions.inc(f"image_{key.kind}")
+
+    def stats(self):
+        """{kind: {hits, misses, evictions, entries, bytes}}"""
+        out = {}
+        for kind in sorted(self.kinds):
+            cache = f"image_{kind}"
+            out[kind] = {
+                "hits": _requests.get(cache, "hit"),
+                "misses": _requests.get(cache, "miss"),
+                "evictions": _evictions.get(cache),
+                "entries": 0,
+                "bytes": 0,
+            }
+        for key, (_, size) in list(self.entries.items()):
+            out[key.kind]["entries"] += 1
+            out[key.kind]["bytes"] += size
+        return out
+
+
+images = ImageCache(IMAGE_CACHE_BYTES)
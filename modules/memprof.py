@@ -0,0 +1,120 @@
+"""
+Project Rotom - Memory Profiling
+"""
+
+import tracemalloc
+
+from modules.constants import *
+from modules.gif_player import GIFPlayer
+from modules.image_cache import PHOTO_BYTES_PER_PIXEL, images, photos
+
+
+def _caches(app):
+    """(owner, container) for every image cache the app holds"""
+    groups = {}
+    for key, (value, _) in list(images.entries.items()):
+        groups.setdefault(f"ImageCache.{key.kind}", []).append(value)
+    yield from sorted(groups.items())
+    # A player only holds the frame its label is showing
+    yield "GIFPlayer._all_gifs", [
+        getattr(g.label, "image", None) for g in GIFPlayer._all_gifs
+    ]
+
+
+def photo_report(app):
+    """Count and pixel bytes of live PhotoImages grouped by owning cache.
+
+    Photos Tk still holds that no cache owns (kept alive by a widget or a
+    leaked reference) are grouped under "unowned".
+    """
+    live = {}
+    for name in app.tk.splitlist(app.tk.call("image", "names")):
+        if app.tk.call("image", "type", name) == "photo":
+            w = int(app.tk.call("image", "width", name))
+            h = int(app.tk.call("image", "height", name))
+            live[str(name)] = w * h * PHOTO_BYTES_PER_PIXEL
+
+    report = {}
+    owned = set()
+    for owner, cache in _caches(app):
+        names = {str(p) for p in photos(cache)} & live.keys()
+        owned |= names
+        report[owner] = {
+            "entries": len(cache),
+            "images": len(names),
+            "bytes": sum(live[n] for n in names),
+        }
+
+    rest = live.keys() - owned
+    report["unowned"] = {
+        "entries": len(rest),
+        "images": len(rest),
+        "bytes": sum(live[n] for n in rest),
+    }
+    report["total"] = {
+        "entries": len(live),
+        "images": len(live),
+        "bytes": sum(live.values()),
+    }
+    report["GIFPlayer._all_gifs"]["entries"] = len(GIFPlayer._all_gifs)
+    return report
+
+
+def format_photos(report):
+    lines = [f"{'owner':34}{'entries':>9}{'images':>9}{'pixel MB':>11}"]
+    for owner, row in report.items():
+        mb = row["bytes"] / 2**20
+        lines.append(f"{owner:34}{row['entries']:9d}{row['images']:9d}{mb:11.2f}")
+    return "\n".join(lines)
+
+
+# ==================== TRACEMALLOC ====================
+
+
+class Session:
+    """Named tracemalloc snapshots, each diffed against the one before"""
+
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.snaps = [("start", self._take())]
+
+    def _take(self):
+        return tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+
+    def mark(self, name):
+        self.snaps.append((name, self._take()))
+
+    def diffs(self, top=10, key="lineno"):
+        """{step: {"total_kb", "top": [...]}} growth between snapshots"""
+        out = {}
+        for (_, old), (name, new) in zip(self.snaps, self.snaps[1:]):
+            stats = new.compare_to(old, key)
+            out[name] = {
+                "total_kb": round(sum(s.size_diff for s in stats) / 1024, 1),
+                "top": [
+                    {
+                        "site": str(s.traceback[0]),
+                        "kb": round(s.size_diff / 1024, 1),
+                        "count": s.count_diff,
+                    }
+                    for s in stats[:top]
+                ],
+            }
+        return out
+
+
+def format_diffs(diffs):
+    lines = []
+    for step, d in diffs.items():
+        lines.append(f"{step}: {d['total_kb']:+.1f} KB")
+        for s in d["top"]:
+            lines.append(f"  {s['kb']:+10.1f} KB {s['count']:+7d}  {s['site']}")
+    return "\n".join(lines)
@@ -0,0 +1,201 @@
+"""
+Project Rotom - Metrics Registry
+
+Counters and histograms kept in memory. ROTOM_METRICS_LOG appends a JSON
+snapshot to a rotating file every METRICS_FLUSH_S seconds and
+ROTOM_METRICS_PORT serves them in Prometheus text format on localhost.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+
+from modules.constants import *
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, n=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + n
+
+    def get(self, *label_values):
+        return self.values.get(label_values, 0)
+
+    def snapshot(self):
+        with self.lock:
+            items = list(self.values.items())
+        return [{"labels": dict(zip(self.labels, k)), "value": v} for k, v in items]
+
+    def prometheus(self):
+        with self.lock:
+            items = list(self.values.items())
+        return [f"{self.name}{_fmt(self.labels, k)} {v}" for k, v in items]
+
+
+class Histogram:
+    """Bucketed distribution per label combination"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=METRICS_BUCKETS_MS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # labels -> [count per bucket..., count above the last, sum]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            row = self.values.get(label_values)
+            if row is None:
+                row = self.values[label_values] = [0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            items = [(k, list(v)) for k, v in self.values.items()]
+        return [
+            {
+                "labels": dict(zip(self.labels, k)),
+                "count": sum(row[:-1]),
+                "sum": round(row[-1], 3),
+                "buckets": dict(zip(map(str, self.buckets), row[:-2])),
+            }
+            for k, row in items
+        ]
+
+    def prometheus(self):
+        with self.lock:
+            items = [(k, list(v)) for k, v in self.values.items()]
+
+        lines = []
+        for k, row in items:
+            total = 0
+            for le, n in zip(list(self.buckets) + ["+Inf"], row[:-1]):
+                total += n
+                lbl = _fmt(self.labels + ("le",), k + (le,))
+                lines.append(f"{self.name}_bucket{lbl} {total}")
+            lines.append(f"{self.name}_sum{_fmt(self.labels, k)} {row[-1]}")
+            lines.append(f"{self.name}_count{_fmt(self.labels, k)} {total}")
+        return lines
+
+
+class Registry:
+    """Every metric in the process, created on first use"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def get(self, cls, name, help, labels, **kwargs):
+        with self.lock:
+            m = self.metrics.get(name)
+            if m is None:
+                m = self.metrics[name] = cls(name, help, labels, **kwargs)
+            return m
+
+    def snapshot(self):
+        return {
+            name: {"type": m.kind, "samples": m.snapshot()}
+            for name, m in list(self.metrics.items())
+        }
+
+    def prometheus(self):
+        lines = []
+        for name, m in list(self.metrics.items()):
+            lines.append(f"# HELP {name} {m.help}")
+            lines.append(f"# TYPE {name} {m.kind}")
+            lines.extend(m.prometheus())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def counter(name, help, labels=()):
+    return registry.get(Counter, name, help, tuple(labels))
+
+
+def histogram(name, help, labels=(), buckets=METRICS_BUCKETS_MS):
+    return registry.get(Histogram, name, help, tuple(labels), buckets=buckets)
+
+
+def _fmt(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+# ==================== EXPORT ====================
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def _flush_loop(log):
+    while True:
+        time.sleep(METRICS_FLUSH_S)
+        log.info(json.dumps({"ts": time.time(), "metrics": registry.snapshot()}))
+
+
+def start_exporters():
+    """Start the JSONL flusher and Prometheus endpoint that are configured"""
+    if METRICS_LOG:
+        log = logging.getLogger("rotom.metrics")
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(METRICS_LOG)), exist_ok=True)
+            handler = RotatingFileHandler(
+                METRICS_LOG, maxBytes=METRICS_LOG_BYTES, backupCount=METRICS_LOG_KEEP
+            )
+            log.addHandler(handler)
+            threading.Thread(
+                target=_flush_loop, args=(log,), name="metrics-flush", daemon=True
+            ).start()
+        except OSError:
+            pass
+
+    if METRICS_PORT:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", METRICS_PORT), _Handler)
+            server.daemon_threads = True
+            threading.Thread(
+                target=server.serve_forever, name="metrics-http", daemon=True
+            ).start()
+        except OSError:
+            pass
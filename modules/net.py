@@ -0,0 +1,497 @@
+"""
+Project Rotom - Shared Network Layer
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+
+from modules.constants import *
+from modules import metrics
+from modules.trace import span
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into a single call"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args):
+        with self.lock:
+            self.calls += 1
+            fut = self.inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self.inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return fut.result()
+
+        try:
+            res = fn(*args)
+            fut.set_result(res)
+            return res
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self.inflight),
+            }
+
+
+class Reply:
+    """Response body shared by every caller of a coalesced request"""
+
+    def __init__(self, url, status_code, content):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self._json = None
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} for {self.url}")
+
+    def json(self):
+        if self._json is None:
+            with span("json", "net", url=self.url):
+                self._json = json.loads(self.content)
+        return self._json
+
+
+class Offline(requests.exceptions.ConnectionError):
+    """Raised straight away, without touching the network, while offline"""
+
+
+class Connectivity:
+    """Tracks whether the network is usable.
+
+    `threshold` consecutive connection failures or timeouts to the probe
+    URL's host switch to offline; failures reaching other hosts (a sprite
+    CDN) don't count. A background probe switches back once the probe URL
+    answers.
+    """
+
+    def __init__(self, probe_url, interval, threshold):
+        self.probe_url = probe_url
+        self.host = urlsplit(probe_url).netloc
+        self.interval = interval
+        self.threshold = threshold
+        self.failures = 0
+        self.online = True
+        self.lock = threading.Lock()
+        self.listeners = []
+
+    def succeeded(self, url):
+        if urlsplit(url).netloc == self.host:
+            with self.lock:
+                self.failures = 0
+
+    def failed(self, url):
+        if urlsplit(url).netloc != self.host:
+            return
+        with self.lock:
+            self.failures += 1
+            if not self.online or self.failures < self.threshold:
+                return
+            self.online = False
+
+        threading.Thread(target=self._probe, name="net-probe", daemon=True).start()
+        self._notify()
+
+    def _probe(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                _transport.head(self.probe_url, timeout=self.interval)
+                break
+            except requests.exceptions.RequestException:
+                pass
+
+        with self.lock:
+            self.online = True
+            self.failures = 0
+        self._notify()
+
+    def _notify(self):
+        for fn in list(self.listeners):
+            try:
+                fn(self.online)
+            except Exception:
+                pass
+
+
+class CircuitOpen(requests.exceptions.RequestException):
+    """Raised straight away while a host's circuit breaker is open"""
+
+
+class Breaker:
+    """Circuit breaker for one host.
+
+    closed: requests flow. open: they fail fast until the cooldown ends.
+    half_open: a single probe request decides whether to close or reopen.
+    """
+
+    def __init__(self, threshold, cooldown, max_cooldown):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self.wait() == 0:
+                self.state = "half_open"
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half_open":
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.failures < self.threshold:
+                return
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def wait(self):
+        """Seconds until a request may be tried again"""
+        if self.state != "open":
+            return 0
+        return max(0, self.opened_at + self.cooldown - time.monotonic())
+
+
+class RequestsTransport:
+    """Plain requests session"""
+
+    name = "requests"
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    def get(self, url, timeout):
+        r = self.session.get(url, timeout=timeout)
+        return r.status_code, r.content
+
+    def head(self, url, timeout):
+        return self.session.head(url, timeout=timeout).status_code
+
+
+class HTTP2Transport:
+    """httpx client that multiplexes requests to a host over one HTTP/2
+    connection. httpx errors are raised as their requests equivalents.
+
+    HTTPS hosts negotiate h2 through ALPN. `prior_knowledge` speaks h2 over
+    plain http:// too (h2c), which is only useful against a local stand-in.
+    """
+
+    name = "http2"
+
+    def __init__(self, prior_knowledge=False):
+        import httpx
+
+        self.httpx = httpx
+        self.client = httpx.Client(
+            http1=not prior_knowledge, http2=True, follow_redirects=True
+        )
+
+    def get(self, url, timeout):
+        r = self._call(self.client.get, url, timeout)
+        return r.status_code, r.content
+
+    def head(self, url, timeout):
+        return self._call(self.client.head, url, timeout).status_code
+
+    def _call(self, fn, url, timeout):
+        try:
+            try:
+                return fn(url, timeout=timeout)
+            except self.httpx.RemoteProtocolError:
+                # httpcore's sync HTTP/2 client can open streams out of order
+                # when threads race, and the server then drops the connection.
+                # GET and HEAD are safe to repeat on a fresh one.
+                return fn(url, timeout=timeout)
+        except self.httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(str(e))
+        except self.httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except self.httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        except self.httpx.HTTPError as e:
+            raise requests.exceptions.RequestException(str(e))
+
+
+def make_transport(name):
+    if name == "http2":
+        try:
+            return HTTP2Transport()
+        except ImportError:
+            pass
+    return RequestsTransport()
+
+
+class Ticket:
+    """A request's claim on a lane; its lane can be raised while it waits"""
+
+    def __init__(self, lane):
+        self.lane = lane
+        self.started_lane = None
+
+
+class Lanes:
+    """Per-priority concurrency limits that defer speculative work.
+
+    A request may not start while a higher-priority one is still waiting,
+    and prefetch/background requests also hold off while any interactive or
+    visible request is running. Deferral only gates the start: a request
+    already in flight is never interrupted, since aborting it would throw
+    away the bytes already received and the retry would cost more than
+    letting it finish. NET_LANE_LIMITS keeps the lower lanes small so at
+    most a few such requests can be ahead of on-screen work.
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.cond = threading.Condition()
+        self.active = [0] * len(limits)
+        self.waiting = []
+
+    def acquire(self, ticket):
+        with self.cond:
+            self.waiting.append(ticket)
+            while not self._may_start(ticket):
+                self.cond.wait()
+            self.waiting.remove(ticket)
+            ticket.started_lane = ticket.lane
+            self.active[ticket.lane] += 1
+
+    def release(self, ticket):
+        with self.cond:
+            self.active[ticket.started_lane] -= 1
+            self.cond.notify_all()
+
+    def boost(self, ticket, lane):
+        with self.cond:
+            if ticket.started_lane is None and lane < ticket.lane:
+                ticket.lane = lane
+                self.cond.notify_all()
+
+    def _may_start(self, ticket):
+        lane = ticket.lane
+        if self.active[lane] >= self.limits[lane]:
+            return False
+        if any(w.lane < lane for w in self.waiting):
+            return False
+        if lane >= PRIO_PREFETCH and any(self.active[:PRIO_PREFETCH]):
+            return False
+        return True
+
+    def stats(self):
+        with self.cond:
+            waiting = [0] * len(self.limits)
+            for w in self.waiting:
+                waiting[w.lane] += 1
+            return {"active": list(self.active), "waiting": waiting}
+
+
+_transport = make_transport(NET_TRANSPORT)
+_flight = SingleFlight()
+_lanes = Lanes(NET_LANE_LIMITS)
+_conn = Connectivity(NET_PROBE_URL, NET_PROBE_INTERVAL, NET_OFFLINE_FAILURES)
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+_requests = metrics.counter(
+    "rotom_http_requests_total", "HTTP requests by outcome", ("endpoint", "status")
+)
+_latency = metrics.histogram(
+    "rotom_http_latency_ms", "HTTP request latency", ("endpoint",)
+)
+
+# Tickets of requests in flight by URL, so joiners can raise their lane
+_tickets = {}
+_tickets_lock = threading.Lock()
+
+_local = threading.local()
+
+
+@contextmanager
+def lane(priority):
+    """Run network calls made by this thread in the given priority lane"""
+    prev = getattr(_local, "lane", None)
+    _local.lane = priority
+    try:
+        yield
+    finally:
+        _local.lane = prev
+
+
+def current_lane():
+    # Calls outside any scheduler task come straight from the Tk thread
+    cur = getattr(_local, "lane", None)
+    return PRIO_INTERACTIVE if cur is None else cur
+
+
+def bind_lane(fn):
+    """Wrap fn so it runs in the caller's lane on another thread"""
+    prio = current_lane()
+
+    def run(*args):
+        with lane(prio):
+            return fn(*args)
+
+    return run
+
+
+def get(url, timeout=10, priority=None):
+    """GET url, joining an identical request if one is already in flight.
+
+    Raises requests exceptions like requests.get does, and Offline without
+    trying while the network is known to be down.
+    """
+    if not _conn.online:
+        _requests.inc(_endpoint(url), "offline")
+        raise Offline(f"Offline: {url}")
+
+    prio = current_lane() if priority is None else priority
+
+    with _tickets_lock:
+        ticket = _tickets.get(url)
+    if ticket:
+        _lanes.boost(ticket, prio)
+
+    return _flight.do(url, _get, url, timeout, prio)
+
+
+def _get(url, timeout, prio):
+    endpoint = _endpoint(url)
+    breaker = _breaker(urlsplit(url).netloc)
+    if not breaker.allow():
+        _requests.inc(endpoint, "circuit_open")
+        raise CircuitOpen(f"Circuit open: {url}")
+
+    ticket = Ticket(prio)
+    with _tickets_lock:
+        _tickets[url] = ticket
+
+    try:
+        _lanes.acquire(ticket)
+        start = time.perf_counter()
+        try:
+            with span("http", "net", url=url, lane=prio):
+                status, content = _transport.get(url, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            breaker.failure()
+            _conn.failed(url)
+            _requests.inc(endpoint, "error")
+            raise
+        except Exception:
+            # Anything else still settles a half-open breaker's probe
+            breaker.failure()
+            _requests.inc(endpoint, "error")
+            raise
+        finally:
+            _lanes.release(ticket)
+
+        _latency.observe((time.perf_counter() - start) * 1000, endpoint)
+        _requests.inc(endpoint, f"{status // 100}xx")
+        _conn.succeeded(url)
+
+        if status >= 500:
+            breaker.failure()
+        else:
+            breaker.success()
+        return Reply(url, status, content)
+    finally:
+        with _tickets_lock:
+            _tickets.pop(url, None)
+
+
+def _endpoint(url):
+    """Low-cardinality label: the API resource, or the sprite kind"""
+    if url.startswith(POKEAPI_BASE_URL):
+        rest = url[len(POKEAPI_BASE_URL) :].lstrip("/")
+        return rest.split("/")[0].split("?")[0] or "root"
+    if url.startswith(SPRITE_BASE_URL):
+        return "sprite_" + url[len(SPRITE_BASE_URL) :].lstrip("/").split("/")[0]
+    return urlsplit(url).netloc
+
+
+def _breaker(host):
+    with _breakers_lock:
+        b = _breakers.get(host)
+        if b is None:
+            b = _breakers[host] = Breaker(
+                BREAKER_THRESHOLD, BREAKER_COOLDOWN, BREAKER_MAX_COOLDOWN
+            )
+        return b
+
+
+def retry_wait(url):
+    """Seconds until retrying a failed request to url's host could succeed,
+    None while offline"""
+    if not _conn.online:
+        return None
+    with _breakers_lock:
+        b = _breakers.get(urlsplit(url).netloc)
+    return b.wait() if b else 0
+
+
+def set_transport(name):
+    """Switch HTTP client at runtime, returns the name actually in use"""
+    global _transport
+    _transport = make_transport(name)
+    return _transport.name
+
+
+def is_offline():
+    return not _conn.online
+
+
+def on_connectivity(fn):
+    """Call fn(online) from a worker thread when the network goes or comes back"""
+    _conn.listeners.append(fn)
+
+
+def stats():
+    with _breakers_lock:
+        breakers = {h: b.state for h, b in _breakers.items()}
+    return {
+        **_flight.stats(),
+        "lanes": _lanes.stats(),
+        "online": _conn.online,
+        "transport": _transport.name,
+        "breakers": breakers,
+    }
@@ -0,0 +1,122 @@
+"""
+Project Rotom - Performance Overlay
+"""
+
+import os
+import sys
+import time
+import tkinter as tk
+
+from modules.constants import *
+from modules import net, sprites
+from modules.gif_player import GIFPlayer
+from modules.image_cache import images
+from modules.pokeapi import cache_stats
+
+
+class PerfOverlay:
+    """Corner readout of loop lag, GIF FPS, cache hit ratios, fetches and RSS.
+
+    Refreshes every PERF_REFRESH_MS while shown and does nothing while hidden.
+    """
+
+    def __init__(self, ctrl):
+        self.ctrl = ctrl
+        self.lbl = None
+        self.job = None
+        self.last = None
+        self.frames = 0
+        self.lag = 0.0
+
+    def toggle(self, e=None):
+        if self.lbl:
+            self.hide()
+        else:
+            self.show()
+
+    def show(self):
+        self.lbl = tk.Label(
+            self.ctrl,
+            font=PERF_FONT,
+            fg=TEXT_COLOR,
+            bg=PERF_BG_COLOR,
+            justify=tk.LEFT,
+            anchor="nw",
+            padx=8,
+            pady=6,
+        )
+        self.lbl.place(x=PERF_X, y=PERF_Y)
+        self.last = time.perf_counter()
+        self.frames = GIFPlayer.frames_shown()
+        self._tick()
+
+    def hide(self):
+        if self.job:
+            self.ctrl.after_cancel(self.job)
+            self.job = None
+        if self.lbl:
+            self.lbl.destroy()
+            self.lbl = None
+
+    def _tick(self):
+        now = time.perf_counter()
+        elapsed = now - self.last
+        # How late this tick ran is how long the loop was busy elsewhere
+        self.lag = max(0.0, elapsed * 1000 - PERF_REFRESH_MS)
+        fps = (GIFPlayer.frames_shown() - self.frames) / elapsed if elapsed else 0
+        self.last, self.frames = now, GIFPlayer.frames_shown()
+
+        self.lbl.configure(text=self._text(fps))
+        self.lbl.lift()
+        self.job = self.ctrl.after(PERF_REFRESH_MS, self._tick)
+
+    def _text(self, fps):
+        api = cache_stats()
+        spr = sprites.stats()
+        img = images.stats().values()
+        img = {k: sum(row[k] for row in img) for k in ("hits", "misses")}
+        ns = net.stats()
+        sched = self.ctrl.sched.stats()
+        rss = _rss_mb()
+        rss = f"{rss:7.1f} MB" if rss is not None else "    n/a"
+        dog = getattr(self.ctrl, "watchdog", None)
+        stall = dog.last_stall() if dog else None
+
+        lines = [
+            f"loop lag   {self.lag:7.1f} ms",
+            f"gif fps    {fps:7.1f}",
+            f"api mem    {_ratio(api['memory']):>7}",
+            f"api disk   {_ratio(api['store']):>7}",
+            f"sprites    {_ratio(spr):>7}",
+            f"images     {_ratio(img):>7} {images.bytes / 2**20:6.1f} MB",
+            f"in flight  {ns['in_flight']:7d}",
+            f"net queued {sum(ns['lanes']['waiting']):7d}",
+            f"tasks      {sched['running']:3d} run {sched['queued']:3d} queued",
+            f"rss        {rss}",
+            f"last stall {stall['ms']:7.0f} ms {stall['site']}" if stall else "",
+            "offline" if not ns["online"] else "",
+        ]
+        return "\n".join(l for l in lines if l)
+
+
+def _ratio(counts):
+    total = counts["hits"] + counts["misses"]
+    return f"{counts['hits'] / total:.0%}" if total else "-"
+
+
+def _rss_mb():
+    """Current resident memory, or peak where only that is available"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes elsewhere
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+    except ImportError:
+        return None
@@ -1,8 +1,14 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 
 import requests
 
 from modules.constants import *
+from modules import metrics, net
+from modules.store import store
+from modules.trace import traced
 
 
 class PokeAPIError(Exception):
@@ -21,15 +27,106 @@ class DataError(PokeAPIError):
     pass
 
 
+class _PartialChain(Exception):
+    """An evolution chain with stages that failed to load"""
+
+    def __init__(self, stages):
+        super().__init__(f"{len(stages)} stages loaded")
+        self.stages = stages
+
+
+# Base stat totals of every Pokémon loaded so far, by id
+_stat_totals = {}
+
+# Concurrent callers for the same species share one fetch and parse
+_species_flight = net.SingleFlight()
+
+_evo_pool = ThreadPoolExecutor(max_workers=EVO_FETCH_WORKERS, thread_name_prefix="evo")
+
+# Stale-while-revalidate: refreshes run here, in the background lane
+_refresh_pool = ThreadPoolExecutor(
+    max_workers=API_REFRESH_WORKERS, thread_name_prefix="refresh"
+)
+_refreshing = set()
+_refresh_lock = threading.Lock()
+_listeners = []
+
+_cache = metrics.counter(
+    "rotom_cache_requests_total", "Cache lookups by result", ("cache", "result")
+)
+
+
+def add_listener(fn):
+    """Call fn(ns, key, value) when a background refresh changes cached data.
+
+    Runs on a worker thread.
+    """
+    _listeners.append(fn)
+
+
+def _swr(ns, key, fetch, cached=None):
+    """Serve `fetch(key)` from the store, refreshing it once past the soft TTL.
+
+    `cached` is the lru_cache'd caller, cleared when a refresh changes the data.
+    """
+    entry = store.get_entry(ns, key)
+    if entry is None:
+        _cache.inc("store", "miss")
+        value = fetch(key)
+        store.put(ns, key, value)
+        return value
+
+    value, ts = entry
+    _cache.inc("store", "hit")
+    if time.time() - ts > API_SOFT_TTL and not net.is_offline():
+        with _refresh_lock:
+            if (ns, key) in _refreshing:
+                return value
+            _refreshing.add((ns, key))
+        _cache.inc("store", "refresh")
+        _refresh_pool.submit(_refresh, ns, key, fetch, cached, value)
+    return value
+
+
+def _refresh(ns, key, fetch, cached, old):
+    try:
+        with net.lane(PRIO_BACKGROUND):
+            value = fetch(key)
+    except Exception:
+        # Keep serving the stale copy; try again on a later read
+        return
+    finally:
+        with _refresh_lock:
+            _refreshing.discard((ns, key))
+
+    store.put(ns, key, value)
+    if value == old:
+        return
+
+    if cached:
+        cached.cache_clear()
+    for fn in list(_listeners):
+        try:
+            fn(ns, key, value)
+        except Exception:
+            pass
+
+
 @lru_cache()
 def get_pokemon(id_or_name):
     key = str(id_or_name).lower().strip()
+    poke = _swr("pokemon", key, _fetch_pokemon, get_pokemon)
+    _stat_totals[poke["id"]] = sum(poke["stats"].values())
+    return poke
+
 
+@traced("api")
+def _fetch_pokemon(key):
     try:
-        r = requests.get(f"{POKEMON_ENDPOINT}/{key}", timeout=10)
+        r = net.get(f"{POKEMON_ENDPOINT}/{key}", timeout=10)
 
         if r.status_code == 404:
-            raise PokemonNotFoundError(f"Pokemon '{id_or_name}' not found")
+            raise PokemonNotFoundError(f"Pokemon '{key}' not found")
 
         r.raise_for_status()
         d = r.json()
@@ -51,6 +148,7 @@ def get_pokemon(id_or_name):
                 "speed": d["stats"][5]["base_stat"],
             },
             "abilities": [a["ability"]["name"].capitalize() for a in d["abilities"]],
+            "moves": [m["move"]["name"] for m in d["moves"]],
         }
 
     except requests.exceptions.ConnectionError:
@@ -63,12 +161,26 @@ def get_pokemon(id_or_name):
         raise DataError(ERR_LOAD_FAILED)
 
 
-@lru_cache()
 def get_pokemon_by_type(type_name):
-    key = str(type_name).lower()
+    try:
+        return _pokemon_by_type(str(type_name).lower())
+    except NetworkError:
+        if not net.is_offline():
+            raise
+        # Offline: the cached Pokémon of that type
+        t = str(type_name).capitalize()
+        return [{"id": p["id"]} for p in get_cached_pokemon() if t in p["types"]]
+
 
+@lru_cache()
+def _pokemon_by_type(key):
+    return _swr("type_members", key, _fetch_pokemon_by_type, _pokemon_by_type)
+
+
+@traced("api")
+def _fetch_pokemon_by_type(key):
     try:
-        r = requests.get(f"{TYPE_ENDPOINT}/{key}", timeout=10)
+        r = net.get(f"{TYPE_ENDPOINT}/{key}", timeout=10)
         r.raise_for_status()
         d = r.json()
 
@@ -90,10 +202,27 @@ def get_pokemon_by_type(type_name):
         raise DataError(ERR_LOAD_FAILED)
 
 
-@lru_cache()
 def get_all_pokemon_names():
     try:
-        r = requests.get(f"{POKEMON_ENDPOINT}?limit={TOTAL_POKEMON}", timeout=15)
+        return _all_names()
+    except NetworkError:
+        if not net.is_offline():
+            raise
+        # Offline: only the Pokémon that can actually be shown
+        return [
+            {"name": p["name"].lower(), "id": p["id"]} for p in get_cached_pokemon()
+        ]
+
+
+@lru_cache()
+def _all_names():
+    return _swr("names", TOTAL_POKEMON, _fetch_all_names, _all_names)
+
+
+@traced("api")
+def _fetch_all_names(limit):
+    try:
+        r = net.get(f"{POKEMON_ENDPOINT}?limit={limit}", timeout=15)
         r.raise_for_status()
         d = r.json()
 
@@ -111,6 +240,22 @@ def get_all_pokemon_names():
         raise DataError(ERR_LOAD_FAILED)
 
 
+def _pokemon_summary(poke):
+    """Index entry for a cached Pokémon: what the offline lists need"""
+    if not poke.get("id"):
+        return None
+    summary = {"id": poke["id"], "name": poke["name"], "types": poke["types"]}
+    return poke["id"], summary
+
+
+store.add_index("pokemon", _pokemon_summary)
+
+
+def get_cached_pokemon():
+    """id, name and types of every Pokémon in the persistent cache, by id"""
+    return sorted(store.index("pokemon"), key=lambda p: p["id"])
+
+
 def search_pokemon_by_name(query):
     q = query.lower()
     names = get_all_pokemon_names()
@@ -124,86 +269,281 @@ def get_type_icon_url(type_name):
 
 
 @lru_cache()
-def get_pokemon_description(id_or_name):
+def get_species(id_or_name):
     key = str(id_or_name).lower()
+    return _species_flight.do(key, _swr, "species", key, _fetch_species, get_species)
+
+
+@traced("api")
+def _fetch_species(key):
     try:
-        r = requests.get(f"{SPECIES_ENDPOINT}/{key}", timeout=10)
+        r = net.get(f"{SPECIES_ENDPOINT}/{key}", timeout=10)
+
+        if r.status_code == 404:
+            raise PokemonNotFoundError(f"Pokemon '{key}' not found")
+
         r.raise_for_status()
         d = r.json()
 
+        desc = ""
         for entry in d["flavor_text_entries"]:
             if entry["language"]["name"] == "en":
                 desc = entry["flavor_text"].replace("\n", " ").replace("\f", " ")
-                return " ".join(desc.split())
-        return ""
-    except:
+                desc = " ".join(desc.split())
+                break
+
+        genus = next(
+            (g["genus"] for g in d.get("genera", []) if g["language"]["name"] == "en"),
+            "",
+        )
+
+        return {
+            "id": d["id"],
+            "name": d["name"].capitalize(),
+            "description": desc,
+            "genus": genus,
+            "evolution_chain_id": _url_id(d["evolution_chain"]["url"]),
+            "is_legendary": d.get("is_legendary", False),
+            "is_mythical": d.get("is_mythical", False),
+        }
+
+    except requests.exceptions.ConnectionError:
+        raise NetworkError(ERR_NO_INTERNET)
+    except requests.exceptions.Timeout:
+        raise NetworkError(ERR_NO_INTERNET)
+    except requests.exceptions.RequestException:
+        raise NetworkError(ERR_LOAD_FAILED)
+    except (KeyError, TypeError, ValueError):
+        raise DataError(ERR_LOAD_FAILED)
+
+
+def get_pokemon_description(id_or_name):
+    try:
+        return get_species(id_or_name)["description"]
+    except PokeAPIError:
         return ""
 
 
 @lru_cache()
 def _fetch_type_data(type_name):
-    r = requests.get(f"{TYPE_ENDPOINT}/{type_name}", timeout=10)
+    return _swr("type", type_name, _fetch_type_doc, _fetch_type_data)
+
+
+@traced("api")
+def _fetch_type_doc(type_name):
+    r = net.get(f"{TYPE_ENDPOINT}/{type_name}", timeout=10)
     r.raise_for_status()
     return r.json()
 
 
-def get_pokemon_weaknesses(types):
-    mults = {}
+@lru_cache()
+def get_type_chart():
+    chart = {a: {d: 1 for d in POKEMON_TYPES} for a in POKEMON_TYPES}
 
-    for t in types:
-        try:
-            d = _fetch_type_data(t.lower())
+    try:
+        for d in POKEMON_TYPES:
+            rel = _fetch_type_data(d.lower())["damage_relations"]
 
-            for x in d["damage_relations"]["double_damage_from"]:
+            for x in rel["double_damage_from"]:
                 n = x["name"].capitalize()
-                mults[n] = mults.get(n, 1) * 2
+                if n in chart:
+                    chart[n][d] = 2
 
-            for x in d["damage_relations"]["half_damage_from"]:
+            for x in rel["half_damage_from"]:
                 n = x["name"].capitalize()
-                mults[n] = mults.get(n, 1) * 0.5
+                if n in chart:
+                    chart[n][d] = 0.5
 
-            for x in d["damage_relations"]["no_damage_from"]:
+            for x in rel["no_damage_from"]:
                 n = x["name"].capitalize()
-                mults[n] = 0
-        except:
-            pass
+                if n in chart:
+                    chart[n][d] = 0
 
-    return sorted([t for t, m in mults.items() if m > 1])
+        return chart
+
+    except requests.exceptions.ConnectionError:
+        raise NetworkError(ERR_NO_INTERNET)
+    except requests.exceptions.Timeout:
+        raise NetworkError(ERR_NO_INTERNET)
+    except requests.exceptions.RequestException:
+        raise NetworkError(ERR_LOAD_FAILED)
+    except KeyError:
+        raise DataError(ERR_LOAD_FAILED)
 
 
 @lru_cache()
-def get_evolution_chain(id_or_name):
-    key = str(id_or_name).lower()
+def get_dex_types():
+    slots = {}
+
+    try:
+        for t in POKEMON_TYPES:
+            for entry in _fetch_type_data(t.lower())["pokemon"]:
+                url = entry["pokemon"]["url"]
+                pid = int(url.rstrip("/").split("/")[-1])
+                if pid <= TOTAL_POKEMON:
+                    slots.setdefault(pid, []).append((entry["slot"], t))
+
+        return {pid: [t for _, t in sorted(ts)] for pid, ts in slots.items()}
+
+    except requests.exceptions.ConnectionError:
+        raise NetworkError(ERR_NO_INTERNET)
+    except requests.exceptions.Timeout:
+        raise NetworkError(ERR_NO_INTERNET)
+    except requests.exceptions.RequestException:
+        raise NetworkError(ERR_LOAD_FAILED)
+    except (KeyError, ValueError):
+        raise DataError(ERR_LOAD_FAILED)
+
+
+@lru_cache()
+def get_move_types():
+    try:
+        return {
+            m["name"]: t
+            for t in POKEMON_TYPES
+            for m in _fetch_type_data(t.lower())["moves"]
+        }
+
+    except requests.exceptions.ConnectionError:
+        raise NetworkError(ERR_NO_INTERNET)
+    except requests.exceptions.Timeout:
+        raise NetworkError(ERR_NO_INTERNET)
+    except requests.exceptions.RequestException:
+        raise NetworkError(ERR_LOAD_FAILED)
+    except KeyError:
+        raise DataError(ERR_LOAD_FAILED)
+
+
+@lru_cache()
+def get_status_moves():
     try:
-        r = requests.get(f"{SPECIES_ENDPOINT}/{key}", timeout=10)
+        r = net.get(f"{MOVE_DAMAGE_CLASS_ENDPOINT}/status", timeout=10)
         r.raise_for_status()
         d = r.json()
 
-        r2 = requests.get(d["evolution_chain"]["url"], timeout=10)
-        r2.raise_for_status()
-        chain = r2.json()
+        return frozenset(m["name"] for m in d["moves"])
+
+    except requests.exceptions.ConnectionError:
+        raise NetworkError(ERR_NO_INTERNET)
+    except requests.exceptions.Timeout:
+        raise NetworkError(ERR_NO_INTERNET)
+    except requests.exceptions.RequestException:
+        raise NetworkError(ERR_LOAD_FAILED)
+    except KeyError:
+        raise DataError(ERR_LOAD_FAILED)
+
+
+@lru_cache()
+def get_attack_types(id_or_name):
+    poke = get_pokemon(id_or_name)
+    move_types = get_move_types()
+    status = get_status_moves()
+
+    found = {
+        move_types[m]
+        for m in poke.get("moves", [])
+        if m in move_types and m not in status
+    }
+    return tuple(t for t in POKEMON_TYPES if t in found)
+
+
+def cache_stats():
+    """Hit/miss counts of the in-memory caches and the persistent store"""
+    mem = [get_pokemon, get_species, _pokemon_by_type, _all_names, _fetch_type_data]
+    infos = [f.cache_info() for f in mem]
+    return {
+        "memory": {
+            "hits": sum(i.hits for i in infos),
+            "misses": sum(i.misses for i in infos),
+        },
+        "store": {
+            "hits": _cache.get("store", "hit"),
+            "misses": _cache.get("store", "miss"),
+        },
+    }
+
+
+def get_known_stat_totals():
+    return dict(_stat_totals)
+
+
+def get_pokemon_weaknesses(types):
+    from modules.type_table import get_type_table
+
+    try:
+        return get_type_table().weaknesses(types)
+    except PokeAPIError:
+        return []
 
-        evos = []
-        _parse_evo(chain["chain"], evos)
 
-        return evos
+def get_evolution_chain(id_or_name):
+    try:
+        return _evolution_chain(str(id_or_name).lower())
+    except _PartialChain as e:
+        # Shown as far as it loaded, fetched again on the next call
+        return e.stages
     except:
         return []
 
 
-def _parse_evo(node, evos):
+@lru_cache()
+def _evolution_chain(key):
+    chain_id = store.get("evo_species", key)
+    if chain_id is None:
+        chain_id = get_species(key)["evolution_chain_id"]
+        store.put("evo_species", key, chain_id)
+
+    return _get_chain(chain_id)
+
+
+@lru_cache()
+@traced("api")
+def _get_chain(chain_id):
+    """Stages of a chain; raises _PartialChain if any stage failed, so only
+    complete chains are memoized or persisted"""
+    stages = store.get("evo_chain", chain_id)
+    if stages is not None:
+        return stages
+
+    r = net.get(f"{EVOLUTION_CHAIN_ENDPOINT}/{chain_id}", timeout=10)
+    r.raise_for_status()
+    chain = r.json()
+
+    names = []
+    _parse_evo(chain["chain"], names)
+
+    # Fetch every stage at once; a failed stage is skipped
+    pokes = list(_evo_pool.map(net.bind_lane(_try_get_pokemon), names))
+    stages = [
+        {"name": p["name"], "id": p["id"], "sprite_url": p["sprite_url"]}
+        for p in pokes
+        if p
+    ]
+    if len(stages) < len(names):
+        raise _PartialChain(stages)
+
+    store.put("evo_chain", chain_id, stages)
+    for s in stages:
+        store.put("evo_species", s["id"], chain_id)
+        store.put("evo_species", s["name"].lower(), chain_id)
+    return stages
+
+
+def _parse_evo(node, names):
     try:
-        name = node["species"]["name"]
-        poke = get_pokemon(name)
-        if poke:
-            evos.append(
-                {
-                    "name": poke["name"],
-                    "id": poke["id"],
-                    "sprite_url": poke["sprite_url"],
-                }
-            )
+        names.append(node["species"]["name"])
         for next_node in node.get("evolves_to", []):
-            _parse_evo(next_node, evos)
+            _parse_evo(next_node, names)
     except:
         pass
+
+
+def _try_get_pokemon(name):
+    try:
+        return get_pokemon(name)
+    except PokeAPIError:
+        return None
+
+
+def _url_id(url):
+    return int(url.rstrip("/").split("/")[-1])
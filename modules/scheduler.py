@@ -0,0 +1,212 @@
+"""
+Project Rotom - Background Task Scheduler
+"""
+
+import itertools
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+
+from modules.constants import *
+from modules import net
+
+
+class Task:
+    """Handle for a submitted job"""
+
+    def __init__(self, fn, args, on_done, on_error, owner, priority, widget):
+        self.fn = fn
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.owner = owner
+        self.priority = priority
+        self.widget = widget
+        self.cancelled = False
+        self.result = None
+        self.error = None
+        self.queued_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+
+    def cancel(self):
+        """Skip the job if it has not started and drop its result if it has"""
+        self.cancelled = True
+
+
+class Scheduler:
+    """Runs blocking work on worker threads and delivers results on the Tk thread.
+
+    Tasks are picked lowest priority value first and grouped by owner, a tuple
+    such as ("PokedexFrame", "detail", 3). Cancelling an owner prefix cancels
+    every group under it, so a frame can drop all of its work at once.
+    """
+
+    def __init__(self, root, workers=SCHED_WORKERS):
+        self.root = root
+        self.queue = queue.PriorityQueue()
+        self.seq = itertools.count()
+        self.done = queue.SimpleQueue()
+        self.posted = queue.SimpleQueue()
+        self.groups = {}
+        self.pending = 0
+        self.running = 0
+        self.lock = threading.Lock()
+        self.job = None
+        self.job_delay = None
+
+        self.completed = 0
+        self.dropped = 0
+        self.waits = deque(maxlen=SCHED_STATS_WINDOW)
+        self.runs = deque(maxlen=SCHED_STATS_WINDOW)
+
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"rotom-{i}", daemon=True).start()
+
+        self._wake(SCHED_IDLE_MS)
+
+    def submit(
+        self,
+        fn,
+        *args,
+        on_done=None,
+        on_error=None,
+        owner=None,
+        priority=PRIO_VISIBLE,
+        widget=None,
+    ):
+        """Run fn(*args) in the background.
+
+        on_done(result) or on_error(exc) is called later on the Tk thread,
+        unless the task was cancelled or `widget` has been destroyed by then.
+        Must itself be called from the Tk thread.
+        """
+        owner = self._key(owner)
+        task = Task(fn, args, on_done, on_error, owner, priority, widget)
+        self.groups.setdefault(owner, set()).add(task)
+        self.pending += 1
+        self.queue.put((priority, next(self.seq), task))
+        self._wake()
+        return task
+
+    def post(self, fn, *args):
+        """Call fn(*args) on the Tk thread soon; safe from any thread"""
+        self.posted.put((fn, args))
+
+    def cancel(self, owner):
+        """Cancel every task whose owner starts with `owner`"""
+        prefix = self._key(owner)
+        for key in [k for k in self.groups if k[: len(prefix)] == prefix]:
+            for task in self.groups.pop(key):
+                task.cancel()
+
+    def stats(self):
+        """Queue depth and latency figures for the recent window"""
+        waits = sorted(self.waits)
+        runs = sorted(self.runs)
+        return {
+            "queued": self.queue.qsize(),
+            "running": self.running,
+            "pending": self.pending,
+            "groups": len(self.groups),
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "wait_ms_p50": _pct(waits, 0.5),
+            "wait_ms_p95": _pct(waits, 0.95),
+            "run_ms_p50": _pct(runs, 0.5),
+            "run_ms_p95": _pct(runs, 0.95),
+        }
+
+    def _key(self, owner):
+        if owner is None:
+            return ()
+        return owner if isinstance(owner, tuple) else (owner,)
+
+    def _work(self):
+        while True:
+            _, _, task = self.queue.get()
+
+            if not task.cancelled:
+                with self.lock:
+                    self.running += 1
+                task.started_at = time.perf_counter()
+                try:
+                    with net.lane(task.priority):
+                        task.result = task.fn(*task.args)
+                except Exception as e:
+                    task.error = e
+                task.finished_at = time.perf_counter()
+                with self.lock:
+                    self.running -= 1
+
+            self.done.put(task)
+
+    def _wake(self, delay=SCHED_POLL_MS):
+        # Work submitted while only the idle poll is armed must not wait for it
+        if self.job is not None:
+            if self.job_delay <= delay:
+                return
+            self.root.after_cancel(self.job)
+        self.job = self.root.after(delay, self._drain)
+        self.job_delay = delay
+
+    def _drain(self):
+        self.job = None
+
+        while True:
+            try:
+                fn, args = self.posted.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception:
+                traceback.print_exc()
+
+        while True:
+            try:
+                task = self.done.get_nowait()
+            except queue.Empty:
+                break
+
+            self.pending -= 1
+            group = self.groups.get(task.owner)
+            if group is not None:
+                group.discard(task)
+                if not group:
+                    del self.groups[task.owner]
+
+            if task.started_at is not None:
+                self.waits.append((task.started_at - task.queued_at) * 1000)
+                self.runs.append((task.finished_at - task.started_at) * 1000)
+
+            if task.cancelled or (task.widget and not _alive(task.widget)):
+                self.dropped += 1
+                continue
+
+            self.completed += 1
+            try:
+                if task.error is None:
+                    if task.on_done:
+                        task.on_done(task.result)
+                elif task.on_error:
+                    task.on_error(task.error)
+            except Exception:
+                traceback.print_exc()
+
+        self._wake(SCHED_POLL_MS if self.pending else SCHED_IDLE_MS)
+
+
+def _alive(widget):
+    try:
+        return bool(widget.winfo_exists())
+    except Exception:
+        return False
+
+
+def _pct(vals, q):
+    if not vals:
+        return 0.0
+    return round(vals[min(len(vals) - 1, int(q * len(vals)))], 2)
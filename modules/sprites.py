@@ -0,0 +1,75 @@
+"""
+Project Rotom - Sprite Fetching
+"""
+
+import hashlib
+import os
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from modules.constants import *
+from modules import atlas, metrics, net
+from modules.trace import span
+
+_cache = metrics.counter(
+    "rotom_cache_requests_total", "Cache lookups by result", ("cache", "result")
+)
+_decode = metrics.histogram("rotom_image_decode_ms", "Image decode and resize time")
+
+
+def fetch_bytes(url, timeout=5):
+    """Image bytes from the disk cache, else downloaded and cached"""
+    path = _disk_path(url)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        _cache.inc("sprite_disk", "hit")
+        return data
+    except OSError:
+        _cache.inc("sprite_disk", "miss")
+
+    r = net.get(url, timeout=timeout)
+    r.raise_for_status()
+    _save(path, r.content)
+    return r.content
+
+
+def fetch_image(url, size, resample=Image.NEAREST):
+    """Download and resize an image. Safe to call off the Tk thread"""
+    img = atlas.crop(url, size, resample)
+    if img is not None:
+        return img
+
+    data = fetch_bytes(url)
+    start = time.perf_counter()
+    with span("decode", "image", url=url):
+        img = Image.open(BytesIO(data)).resize(size, resample)
+    _decode.observe((time.perf_counter() - start) * 1000)
+    return img
+
+
+def stats():
+    """Disk cache hits and misses"""
+    return {
+        "hits": _cache.get("sprite_disk", "hit"),
+        "misses": _cache.get("sprite_disk", "miss"),
+    }
+
+
+def _disk_path(url):
+    name = hashlib.sha1(url.encode()).hexdigest()
+    return os.path.join(SPRITE_CACHE_DIR, name + os.path.splitext(url)[1])
+
+
+def _save(path, data):
+    # Write then rename so a crash never leaves half a sprite behind
+    try:
+        os.makedirs(SPRITE_CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        pass
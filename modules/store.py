@@ -0,0 +1,105 @@
+"""
+Project Rotom - Persistent Key-Value Store
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from modules.constants import *
+
+
+class Store:
+    """SQLite-backed JSON store for data that should survive restarts.
+
+    Disk problems are never fatal: reads miss and writes are dropped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+        self.indexes = {}  # ns -> fn(value) -> (key, summary) or None
+
+    def _db(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                "ns TEXT, key TEXT, value TEXT, ts REAL, PRIMARY KEY (ns, key))"
+            )
+        return self.conn
+
+    def get(self, ns, key):
+        """Stored value, or None"""
+        entry = self.get_entry(ns, key)
+        return entry[0] if entry else None
+
+    def get_entry(self, ns, key):
+        """(value, unix time written), or None"""
+        try:
+            with self.lock:
+                row = (
+                    self._db()
+                    .execute(
+                        "SELECT value, ts FROM kv WHERE ns = ? AND key = ?",
+                        (ns, str(key)),
+                    )
+                    .fetchone()
+                )
+            return (json.loads(row[0]), row[1]) if row else None
+        except (sqlite3.Error, OSError, ValueError):
+            return None
+
+    def add_index(self, ns, fn):
+        """Keep a small summary of every value put in `ns`, read with index()"""
+        self.indexes[ns] = fn
+
+    def index(self, ns):
+        """Every summary in the index of `ns`, built from its values if empty"""
+        rows = self.values(f"{ns}.index")
+        if rows:
+            return rows
+        # A cache written before the index existed
+        for value in self.values(ns):
+            entry = self.indexes[ns](value)
+            if entry:
+                self.put(f"{ns}.index", *entry)
+        return self.values(f"{ns}.index")
+
+    def values(self, ns):
+        """Every stored value in a namespace"""
+        try:
+            with self.lock:
+                rows = (
+                    self._db()
+                    .execute("SELECT value FROM kv WHERE ns = ?", (ns,))
+                    .fetchall()
+                )
+            return [json.loads(r[0]) for r in rows]
+        except (sqlite3.Error, OSError, ValueError):
+            return []
+
+    def put(self, ns, key, value):
+        try:
+            rows = [(ns, key, value)]
+            entry = ns in self.indexes and self.indexes[ns](value)
+            if entry:
+                rows.append((f"{ns}.index", *entry))
+            now = time.time()
+            rows = [
+                (n, str(k), json.dumps(v, separators=(",", ":")), now)
+                for n, k, v in rows
+            ]
+            with self.lock:
+                db = self._db()
+                db.executemany("INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?)", rows)
+                db.commit()
+        except (sqlite3.Error, OSError, TypeError, ValueError):
+            pass
+
+
+store = Store(CACHE_DB)
@@ -0,0 +1,152 @@
+"""
+Project Rotom - Team Analytics Engine
+"""
+
+from functools import lru_cache
+from operator import add
+
+from modules.constants import *
+from modules.pokeapi import get_pokemon, get_dex_types, get_attack_types
+from modules.type_table import get_type_table
+
+STAT_KEYS = ("hp", "attack", "defense", "sp_attack", "sp_defense", "speed")
+
+
+class TypeMatrix:
+    """Type table as per-type vectors, cached per type combination"""
+
+    def __init__(self, table):
+        self.table = table
+        self.idx = {t: i for i, t in enumerate(POKEMON_TYPES)}
+        # Attacker rows are the single-type defense columns transposed
+        cols = [table.lookup((d,)) for d in POKEMON_TYPES]
+        self.rows = [list(r) for r in zip(*cols)]
+        self._flags = {}
+        self._combo_rows = {}
+
+    def defense(self, types):
+        """Damage multiplier taken from each attacking type"""
+        return self.table.lookup(types)
+
+    def offense(self, types):
+        """Best STAB multiplier against each defending type"""
+        rows = [self.rows[self.idx[t]] for t in types if t in self.idx]
+        if not rows:
+            return (1,) * len(POKEMON_TYPES)
+        return tuple(max(col) for col in zip(*rows))
+
+    def flags(self, types):
+        """0/1 vectors (weak, resist, immune, covers) for a type combination"""
+        key = tuple(types)
+        f = self._flags.get(key)
+        if f is None:
+            dv = self.defense(types)
+            ov = self.offense(types)
+            f = (
+                tuple(int(m > 1) for m in dv),
+                tuple(int(0 < m < 1) for m in dv),
+                tuple(int(m == 0) for m in dv),
+                tuple(int(m > 1) for m in ov),
+            )
+            self._flags[key] = f
+        return f
+
+    def combo_rows(self, combos):
+        """Per attacking type, its multiplier against each defending combination"""
+        key = tuple(combos)
+        rows = self._combo_rows.get(key)
+        if rows is None:
+            rows = list(zip(*(self.table.lookup(c) for c in combos)))
+            self._combo_rows[key] = rows
+        return rows
+
+
+@lru_cache()
+def get_type_matrix():
+    return TypeMatrix(get_type_table())
+
+
+@lru_cache()
+def get_dual_combos():
+    """Dual-type combinations present in the dex, most common first"""
+    counts = {}
+    for types in get_dex_types().values():
+        if len(types) == 2:
+            pair = tuple(sorted(types, key=POKEMON_TYPES.index))
+            counts[pair] = counts.get(pair, 0) + 1
+    return tuple(sorted(counts, key=lambda c: -counts[c]))
+
+
+def _by_type(vec):
+    return {t: n for t, n in zip(POKEMON_TYPES, vec) if n}
+
+
+def analyze_team(team, matrix=None):
+    """Analyze a team of Pokémon dicts or ids in a single pass.
+
+    Returns per-type member counts for weaknesses, resistances, immunities
+    and STAB coverage, plus the team's average base stats.
+    """
+    pokes = [p if isinstance(p, dict) else get_pokemon(p) for p in team if p]
+    if matrix is None:
+        matrix = get_type_matrix()
+
+    zero = (0,) * len(POKEMON_TYPES)
+    weak, resist, immune, cover = zero, zero, zero, zero
+    totals = (0,) * len(STAT_KEYS)
+
+    for p in pokes:
+        w, r, i, c = matrix.flags(p.get("types", []))
+        weak = tuple(map(add, weak, w))
+        resist = tuple(map(add, resist, r))
+        immune = tuple(map(add, immune, i))
+        cover = tuple(map(add, cover, c))
+
+        stats = p.get("stats", {})
+        totals = tuple(map(add, totals, (stats.get(k, 0) for k in STAT_KEYS)))
+
+    cnt = len(pokes) or 1
+
+    return {
+        "size": len(pokes),
+        "weak": _by_type(weak),
+        "resist": _by_type(resist),
+        "immune": _by_type(immune),
+        "coverage": _by_type(cover),
+        "stats": {k: int(v / cnt) for k, v in zip(STAT_KEYS, totals)},
+    }
+
+
+def offensive_coverage(team, matrix=None):
+    """Best damaging-move multiplier the team has against every single type
+    and every dual-type combination in the dex, memoized per composition.
+    """
+    ids = tuple(sorted(p["id"] if isinstance(p, dict) else p for p in team if p))
+    return _coverage(ids, matrix or get_type_matrix())
+
+
+@lru_cache(maxsize=256)
+def _coverage(ids, matrix):
+    atk = set()
+    for pid in ids:
+        atk.update(get_attack_types(pid))
+
+    duals = get_dual_combos()
+    combos = tuple((t,) for t in POKEMON_TYPES) + duals
+    rows = matrix.combo_rows(combos)
+
+    # Element-wise max over the team's attacking types, one row per type
+    team_rows = [rows[matrix.idx[t]] for t in atk]
+    best = [max(col) for col in zip(*team_rows)] if team_rows else [0] * len(combos)
+
+    n = len(POKEMON_TYPES)
+    singles = dict(zip(POKEMON_TYPES, best[:n]))
+    dual_best = dict(zip(duals, best[n:]))
+
+    return {
+        "attack_types": [t for t in POKEMON_TYPES if t in atk],
+        "singles": singles,
+        "gaps": [t for t, m in singles.items() if m <= 1],
+        "duals": dual_best,
+        "dual_gaps": [c for c, m in dual_best.items() if m <= 1],
+    }
@@ -0,0 +1,126 @@
+"""
+Project Rotom - Team Optimiser
+"""
+
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from operator import add
+
+from modules.constants import *
+
+# Score weights
+RESISTED_W = 2.0  # per type at least one member resists
+COVERED_W = 1.0  # per type hit super effectively by a STAB type
+SHARED_W = 1.0  # per squared member count weak to the same type
+EXPOSED_W = 3.0  # per weakness nobody on the team resists
+STAT_W = 0.02  # per point of average base stat total
+
+START_TEMP = 4.0
+
+_pool = None
+
+
+def score_team(types_list, totals, matrix):
+    """Higher is better: few shared weaknesses, many resistances, high stats"""
+    zero = (0,) * len(POKEMON_TYPES)
+    weak, resist, cover = zero, zero, zero
+
+    for types in types_list:
+        w, r, i, c = matrix.flags(types)
+        weak = tuple(map(add, weak, w))
+        resist = tuple(map(add, resist, map(add, r, i)))
+        cover = tuple(map(add, cover, c))
+
+    shared = sum(w * w for w in weak)
+    exposed = sum(1 for w, r in zip(weak, resist) if w and not r)
+    resisted = sum(1 for r in resist if r)
+    covered = sum(1 for c in cover if c)
+    stat = sum(totals) / len(totals) if totals else 0
+
+    return (
+        resisted * RESISTED_W
+        + covered * COVERED_W
+        - shared * SHARED_W
+        - exposed * EXPOSED_W
+        + stat * STAT_W
+    )
+
+
+def optimise(locked, slots, dex, matrix, stat_totals, budget, seed=None):
+    """Simulated annealing over the dex to fill `slots` free team slots.
+
+    `locked` are the Pokémon dicts already on the team, `dex` maps id to
+    types and `stat_totals` maps id to base stat total where known. Returns
+    the best list of ids found within `budget` seconds.
+    """
+    rng = random.Random(seed)
+
+    taken = {p["id"] for p in locked}
+    pool = [pid for pid in dex if pid not in taken]
+    slots = min(slots, len(pool))
+    if slots <= 0:
+        return []
+
+    known = list(stat_totals.values())
+    default_total = sum(known) / len(known) if known else 0
+
+    fixed_types = [p.get("types", []) for p in locked]
+    fixed_totals = [sum(p.get("stats", {}).values()) for p in locked]
+
+    def score(ids):
+        return score_team(
+            fixed_types + [dex[pid] for pid in ids],
+            fixed_totals + [stat_totals.get(pid, default_total) for pid in ids],
+            matrix,
+        )
+
+    cur = rng.sample(pool, slots)
+    cur_s = score(cur)
+    best, best_s = cur, cur_s
+
+    end = time.monotonic() + budget
+    while True:
+        left = end - time.monotonic()
+        if left <= 0:
+            break
+
+        cand = rng.choice(pool)
+        if cand in cur:
+            continue
+        nxt = cur.copy()
+        nxt[rng.randrange(slots)] = cand
+        s = score(nxt)
+
+        temp = START_TEMP * left / budget + 1e-6
+        if s >= cur_s or rng.random() < math.exp((s - cur_s) / temp):
+            cur, cur_s = nxt, s
+            if s > best_s:
+                best, best_s = nxt, s
+
+    return best
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def start_optimise(locked, slots, dex, matrix, stat_totals, budget):
+    """Run optimise() in a worker process, returns a Future"""
+    global _pool
+    args = (locked, slots, dex, matrix, stat_totals, budget)
+    try:
+        return _get_pool().submit(optimise, *args)
+    except BrokenProcessPool:
+        # The worker died (killed or out of memory), start a fresh one
+        _pool.shutdown(wait=False)
+        _pool = None
+        return _get_pool().submit(optimise, *args)
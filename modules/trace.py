@@ -0,0 +1,103 @@
+"""
+Project Rotom - Tracing Spans
+
+Set ROTOM_TRACE=trace.json to record timing spans and write them on exit
+as Chrome trace events (open in chrome://tracing or Perfetto). When it is
+not set, @traced returns the function untouched and span() hands back a
+shared no-op context, so instrumented code pays nothing.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+from modules.constants import *
+
+ENABLED = bool(TRACE_PATH)
+
+_events = []
+_threads = {}
+_pid = os.getpid()
+_t0 = time.perf_counter()
+_NULL = nullcontext()
+
+
+def _record(name, cat, start, end, args):
+    tid = threading.get_ident()
+    if tid not in _threads:
+        _threads[tid] = threading.current_thread().name
+    ev = {
+        "name": name,
+        "cat": cat,
+        "ph": "X",
+        "ts": round((start - _t0) * 1e6, 1),
+        "dur": round((end - start) * 1e6, 1),
+        "pid": _pid,
+        "tid": tid,
+    }
+    if args:
+        ev["args"] = args
+    _events.append(ev)
+
+
+@contextmanager
+def _span(name, cat="app", **args):
+    """Time a block: `with span("decode", "image", url=url): ...`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, cat, start, time.perf_counter(), args)
+
+
+def _no_span(name, cat="app", **args):
+    return _NULL
+
+
+span = _span if ENABLED else _no_span
+
+
+def traced(cat="app"):
+    """Decorator timing every call under the function's qualified name"""
+
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+
+        name = fn.__qualname__
+
+        @wraps(fn)
+        def run(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(name, cat, start, time.perf_counter(), None)
+
+        return run
+
+    return wrap
+
+
+def dump(path=None):
+    """Write the spans recorded so far as Chrome trace JSON"""
+    names = [
+        {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": _pid,
+            "tid": tid,
+            "args": {"name": name},
+        }
+        for tid, name in list(_threads.items())
+    ]
+    with open(path or TRACE_PATH, "w") as f:
+        json.dump({"traceEvents": names + list(_events)}, f)
+
+
+if ENABLED:
+    atexit.register(dump)
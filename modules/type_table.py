@@ -0,0 +1,74 @@
+"""
+Project Rotom - Defensive Type Table
+"""
+
+import time
+from functools import lru_cache
+from itertools import combinations
+
+from modules.constants import *
+from modules import net
+from modules.pokeapi import PokeAPIError, get_type_chart
+from modules.store import store
+
+TABLE_KEY = "type_defense_v2"
+
+_ORDER = {t: i for i, t in enumerate(POKEMON_TYPES)}
+
+
+def combo_key(types):
+    """Canonical key for a type combination: known types in chart order"""
+    return "/".join(sorted((t for t in types if t in _ORDER), key=_ORDER.get))
+
+
+class TypeTable:
+    """Damage multipliers taken from each attacking type, for all 171 single
+    and dual type combinations
+    """
+
+    def __init__(self, vectors):
+        self.vectors = {k: tuple(v) for k, v in vectors.items()}
+        self.neutral = (1,) * len(POKEMON_TYPES)
+
+    @classmethod
+    def from_chart(cls, chart):
+        vectors = {}
+        combos = [(t,) for t in POKEMON_TYPES] + list(combinations(POKEMON_TYPES, 2))
+        for combo in combos:
+            vec = []
+            for a in POKEMON_TYPES:
+                m = 1
+                for d in combo:
+                    m *= chart[a][d]
+                vec.append(m)
+            vectors[combo_key(combo)] = vec
+        return cls(vectors)
+
+    def lookup(self, types):
+        return self.vectors.get(combo_key(types), self.neutral)
+
+    def weaknesses(self, types):
+        vec = self.lookup(types)
+        return sorted(t for t, m in zip(POKEMON_TYPES, vec) if m > 1)
+
+
+@lru_cache()
+def get_type_table():
+    """Load the table from disk, rebuilding it when missing, built from another
+    API or older than the soft TTL"""
+    saved, ts = store.get_entry("tables", TABLE_KEY) or ({}, 0)
+    if saved.get("source") != POKEAPI_BASE_URL or len(saved["vectors"]) != 171:
+        saved = {}
+    elif time.time() - ts <= API_SOFT_TTL or net.is_offline():
+        return TypeTable(saved["vectors"])
+
+    try:
+        table = TypeTable.from_chart(get_type_chart())
+    except PokeAPIError:
+        # A stale table beats none
+        if saved:
+            return TypeTable(saved["vectors"])
+        raise
+    saved = {"source": POKEAPI_BASE_URL, "vectors": table.vectors}
+    store.put("tables", TABLE_KEY, saved)
+    return table
@@ -0,0 +1,124 @@
+"""
+Project Rotom - Event Loop Watchdog
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from logging.handlers import RotatingFileHandler
+
+from modules.constants import *
+
+log = logging.getLogger("rotom.watchdog")
+
+
+class Watchdog:
+    """Detects Tk main-loop stalls and attributes them to a call site.
+
+    The Tk thread stamps a heartbeat every WATCHDOG_BEAT_MS. A background
+    thread samples the main thread's stack whenever the stamp is older than
+    WATCHDOG_STALL_MS, and logs the stall with its most sampled app frame
+    once the loop runs again.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.main_id = threading.main_thread().ident
+        self.beat = time.perf_counter()
+        self.samples = []
+        self.stalls = deque(maxlen=WATCHDOG_HISTORY)
+
+        root.after(WATCHDOG_BEAT_MS, self._heartbeat)
+        threading.Thread(target=self._watch, name="watchdog", daemon=True).start()
+
+    def _heartbeat(self):
+        self.beat = time.perf_counter()
+        self.root.after(WATCHDOG_BEAT_MS, self._heartbeat)
+
+    def _watch(self):
+        stall_start = None
+
+        while True:
+            time.sleep(WATCHDOG_SAMPLE_MS / 1000)
+            beat = self.beat
+            late = (time.perf_counter() - beat) * 1000 - WATCHDOG_BEAT_MS
+
+            if late > WATCHDOG_STALL_MS:
+                if stall_start is None:
+                    stall_start = beat
+                    self.samples = []
+                frame = sys._current_frames().get(self.main_id)
+                if frame is not None:
+                    self.samples.append(_stack(frame))
+            elif stall_start is not None:
+                self._report(stall_start, beat)
+                stall_start = None
+
+    def _report(self, start, resumed):
+        # The loop was free until the first missed beat was due
+        ms = (resumed - start) * 1000 - WATCHDOG_BEAT_MS
+        sites = Counter(_call_site(s) for s in self.samples)
+        site, hits = sites.most_common(1)[0] if sites else ("unknown", 0)
+        leaf = self.samples[-1][0] if self.samples else "unknown"
+
+        stall = {
+            "time": time.time(),
+            "ms": round(ms, 1),
+            "site": site,
+            "leaf": leaf,
+            "samples": len(self.samples),
+            "share": round(hits / len(self.samples), 2) if self.samples else 0,
+        }
+        self.stalls.append(stall)
+        log.warning(
+            "Main loop stalled %.0f ms in %s (%d/%d samples, leaf %s)",
+            ms,
+            site,
+            hits,
+            len(self.samples),
+            leaf,
+        )
+
+    def last_stall(self):
+        return self.stalls[-1] if self.stalls else None
+
+
+def _stack(frame):
+    """Innermost-first 'qualname (file:line)' strings for a frame"""
+    out = []
+    while frame is not None:
+        code = frame.f_code
+        path = code.co_filename
+        if path.startswith(BASE_DIR):
+            path = os.path.relpath(path, BASE_DIR)
+        out.append(f"{code.co_qualname} ({path}:{frame.f_lineno})")
+        frame = frame.f_back
+    return out
+
+
+def _call_site(stack):
+    """Innermost frame that belongs to the app rather than a library"""
+    for entry in stack:
+        path = entry.rsplit("(", 1)[1]
+        if path.startswith(("frames", "modules")) and "watchdog.py" not in path:
+            return entry
+    return stack[0] if stack else "unknown"
+
+
+def start(root):
+    """Start the watchdog and log stalls to WATCHDOG_LOG"""
+    if not log.handlers:
+        try:
+            os.makedirs(os.path.dirname(WATCHDOG_LOG), exist_ok=True)
+            handler = RotatingFileHandler(
+                WATCHDOG_LOG, maxBytes=WATCHDOG_LOG_BYTES, backupCount=2
+            )
+        except OSError:
+            handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.WARNING)
+    return Watchdog(root)